@@ -0,0 +1,83 @@
+"""
+Bytes per member of the in-memory profile representations, at 10k and 100k members.
+
+Run from the repository root:  python -m benchmarks.profile_memory
+"""
+import argparse
+import json
+import os
+import random
+import tracemalloc
+from dataclasses import asdict, fields, make_dataclass
+
+# bot.construct reads these at import time; the benchmark never talks to Telegram
+os.environ.setdefault("ADMIN_ID", "0")
+os.environ.setdefault("GROUP_ID", "0")
+
+from bot.construct import RES  # noqa: E402
+from bot.profiles import Profile  # noqa: E402
+from bot.storage import _FileStore  # noqa: E402
+
+# the previous Profile layout: same fields, one __dict__ per instance
+DictProfile = make_dataclass("DictProfile", [(f.name, f.type, f) for f in fields(Profile)])
+
+
+def make_records(n: int) -> dict:
+    rng = random.Random(n)
+    labels = RES.LABELS
+    records = {}
+    for i in range(n):
+        uid = 100_000_000 + i
+        records[str(uid)] = asdict(Profile(
+            first_name=f"نام{i}",
+            last_name=f"خانوادگی{i}",
+            user_id=uid,
+            study_field=rng.choice(labels["study_fields"]),
+            student_id=40_000_000 + i,
+            email=f"student{i}@umz.ac.ir",
+            phone_number=9_110_000_000 + i,
+            degree=rng.choice(labels["degrees"]),
+            university=rng.choice(labels["universities"]),
+            is_signed_up=True,
+            is_verified=rng.random() < 0.8,
+            skills=rng.sample(labels["skills"], 2),
+            interests=rng.sample(labels["interests"], 2),
+        ))
+    return records
+
+
+def measure(build) -> int:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del kept
+    return used
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("sizes", nargs="*", type=int, default=[10_000, 100_000])
+    args = parser.parse_args()
+
+    for n in args.sizes:
+        # every layout is built from freshly parsed JSON, as on startup or hydration
+        text = json.dumps(make_records(n), ensure_ascii=False)
+        store = _FileStore()
+        store._read = lambda: json.loads(text)
+
+        rows = {
+            "raw dict records": lambda: json.loads(text),
+            "Profile with __dict__": lambda: [DictProfile(**v) for v in json.loads(text).values()],
+            "Profile with __slots__": lambda: [Profile(**v) for v in json.loads(text).values()],
+            "compact store records": lambda: store.records,
+        }
+        print(f"{n} members")
+        for name, build in rows.items():
+            store._records = None
+            print(f"  {name:<24}{measure(build) / n:>8.0f} bytes/member")
+
+
+if __name__ == "__main__":
+    main()
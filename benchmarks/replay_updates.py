@@ -0,0 +1,96 @@
+"""
+Record updates from Telegram and replay them against the bot's webhook endpoint.
+
+Run from the repository root:
+    python -m benchmarks.replay_updates record updates.jsonl
+    python -m benchmarks.replay_updates replay updates.jsonl --repeat 20 --concurrency 10
+
+``record`` reads the updates Telegram is holding for the bot (TOKEN, no webhook set) without
+acknowledging them. ``replay`` POSTs each one to a bot started with ``run.py --webhook``, with
+the WEBHOOK_SECRET header, and reports how fast the endpoint took them in.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import httpx
+
+# bot.construct reads these at import time
+os.environ.setdefault("ADMIN_ID", "0")
+os.environ.setdefault("GROUP_ID", "0")
+
+from bot.construct import Config  # noqa: E402
+
+
+def default_url() -> str:
+    return f"http://{Config.WEBHOOK_LISTEN}:{Config.WEBHOOK_PORT}/{Config.WEBHOOK_PATH.lstrip('/')}"
+
+
+def record(path: str) -> None:
+    response = httpx.get(f"https://api.telegram.org/bot{Config.TOKEN}/getUpdates", timeout=30)
+    updates = response.json()["result"]
+    with open(path, 'a', encoding='utf-8') as f:
+        for update in updates:
+            f.write(json.dumps(update, ensure_ascii=False) + "\n")
+    print(f"{len(updates)} updates appended to {path}")
+
+
+def load(path: str):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+async def replay(updates, url: str, secret: str, concurrency: int):
+    headers = {"X-Telegram-Bot-Api-Secret-Token": secret} if secret else {}
+    queue = asyncio.Queue()
+    for update in updates:
+        queue.put_nowait(update)
+    latencies, statuses = [], {}
+
+    async def worker(client):
+        while not queue.empty():
+            update = queue.get_nowait()
+            start = time.perf_counter()
+            response = await client.post(url, json=update, headers=headers)
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return elapsed, sorted(latencies), statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = subparsers.add_parser("record", help="Append the pending updates to a JSON-lines file")
+    record_parser.add_argument("file")
+
+    replay_parser = subparsers.add_parser("replay", help="POST the updates of a JSON-lines file to the webhook")
+    replay_parser.add_argument("file")
+    replay_parser.add_argument("--url", default=default_url(), help="Webhook endpoint (defaults to WEBHOOK_*)")
+    replay_parser.add_argument("--secret", default=Config.WEBHOOK_SECRET, help="Defaults to WEBHOOK_SECRET")
+    replay_parser.add_argument("--repeat", type=int, default=1, help="Send the whole file this many times")
+    replay_parser.add_argument("--concurrency", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record(args.file)
+        return
+
+    updates = load(args.file) * args.repeat
+    elapsed, latencies, statuses = asyncio.run(replay(updates, args.url, args.secret, args.concurrency))
+    print(f"{len(updates)} updates in {elapsed:.2f}s ({len(updates) / elapsed:.0f}/s), status codes {statuses}")
+    if latencies:
+        print(f"latency p50 {1000 * latencies[len(latencies) // 2]:.1f}ms, "
+              f"p95 {1000 * latencies[int(len(latencies) * 0.95)]:.1f}ms, max {1000 * latencies[-1]:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Snapshot size and load time of every available codec, at 1k, 10k and 100k members.
+
+Run from the repository root:  python -m benchmarks.startup_codecs
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+# bot.construct reads these at import time; the benchmark never talks to Telegram
+os.environ.setdefault("ADMIN_ID", "0")
+os.environ.setdefault("GROUP_ID", "0")
+
+from bot.storage import JournalStore  # noqa: E402
+from bot.utility import CODECS, orjson  # noqa: E402
+from benchmarks.profile_memory import make_records  # noqa: E402
+
+
+def timed(fn, repeat: int = 3) -> float:
+    """Best of ``repeat`` runs, in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def codecs():
+    rows = {
+        "stdlib json, indent=2": (
+            lambda d: json.dumps(d, ensure_ascii=False, indent=2).encode('utf-8'),
+            json.loads
+        ),
+        "stdlib json, compact": (
+            lambda d: json.dumps(d, ensure_ascii=False, separators=(',', ':')).encode('utf-8'),
+            json.loads
+        ),
+    }
+    if orjson is not None:
+        rows["orjson, compact"] = (orjson.dumps, orjson.loads)
+    for name, codec in CODECS.items():
+        if name != "json":
+            rows[name] = (codec.dumps, codec.loads)
+    return rows
+
+
+def store_startup(records, directory: str, binary_codec=None) -> float:
+    """Time for a JournalStore to come up on a compacted snapshot of ``records``."""
+    snapshot = os.path.join(directory, f"database-{binary_codec or 'json'}.json")
+    journal = os.path.join(directory, "database.journal")
+    JournalStore(snapshot, journal, binary_codec=binary_codec).recover(records)
+
+    def start():
+        return JournalStore(snapshot, journal, binary_codec=binary_codec).records
+    return timed(start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("sizes", nargs="*", type=int, default=[1_000, 10_000, 100_000])
+    args = parser.parse_args()
+
+    for n in args.sizes:
+        records = make_records(n)
+        print(f"{n} members")
+        print(f"  {'codec':<24}{'size':>10}{'dump':>10}{'load':>10}")
+        for name, (dumps, loads) in codecs().items():
+            data = dumps(records)
+            print(f"  {name:<24}{len(data) / 1024:>8.0f}kB"
+                  f"{timed(lambda: dumps(records)):>8.1f}ms{timed(lambda: loads(data)):>8.1f}ms")
+
+        with tempfile.TemporaryDirectory() as directory:
+            for codec in [None, *(name for name in CODECS if name != "json")]:
+                label = f"store startup, {codec or 'json'}"
+                print(f"  {label:<44}{store_startup(records, directory, codec):>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from telegram import error
+from .construct import RES
+from .outbound import BULK_REQUEST
+from .utility import json_read, json_write
+
+
+log = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """``rate`` tokens per second, at most ``capacity`` of them saved up for bursts."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float) -> None:
+        """Hands out nothing for ``seconds``; used when Telegram asks to back off."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self) -> None:
+        # the lock keeps waiters in arrival order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+def _seconds(period) -> float:
+    return period.total_seconds() if isinstance(period, timedelta) else float(period)
+
+
+def window_slot(chat_id: int) -> float:
+    """Stable position of a chat in a send window, from 0 (its start) to 1 (its end)."""
+    return zlib.crc32(str(chat_id).encode()) / 2 ** 32
+
+
+@dataclass
+class BroadcastResult:
+    sent: int = 0
+    failed: int = 0
+    blocked: int = 0
+    deleted: int = 0
+    skipped: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def done(self) -> int:
+        return self.sent + self.failed + self.blocked + self.deleted
+
+    def __str__(self) -> str:
+        return (f"sent {self.sent}, failed {self.failed}, blocked {self.blocked}, deleted {self.deleted}, "
+                f"skipped {self.skipped} unreachable in {self.elapsed:.1f}s")
+
+
+class DeliveryLog:
+    """
+    Last delivery outcome per chat: ``ok`` with the time of the last successful delivery, or
+    ``blocked`` / ``deleted`` with the time Telegram refused it. Chats that are blocked or
+    deleted are left out of broadcasts until the user writes to the bot again.
+    """
+
+    OK = "ok"
+    BLOCKED = "blocked"
+    DELETED = "deleted"
+
+    def __init__(self, path: str):
+        self.path = path
+        self.outcomes: Dict[str, Tuple[str, int]] = {}
+        if os.path.exists(path):
+            self.outcomes = {key: tuple(value) for key, value in json_read(path).items()}
+        self.counts = Counter(status for status, _ in self.outcomes.values())
+
+    def _set(self, chat_id: int, status: Optional[str]) -> None:
+        key = str(chat_id)
+        old = self.outcomes.pop(key, None)
+        if old is not None:
+            self.counts[old[0]] -= 1
+        if status is not None:
+            self.outcomes[key] = (status, int(time.time()))
+            self.counts[status] += 1
+
+    @classmethod
+    def classify(cls, e: error.TelegramError) -> Optional[str]:
+        """``blocked`` or ``deleted`` for errors that will not go away by retrying, else None."""
+        message = e.message.lower()
+        if isinstance(e, error.Forbidden):
+            return cls.DELETED if "deactivated" in message else cls.BLOCKED
+        if isinstance(e, error.BadRequest) and "chat not found" in message:
+            return cls.DELETED
+        return None
+
+    def delivered(self, chat_id: int) -> None:
+        self._set(chat_id, self.OK)
+
+    def refused(self, chat_id: int, status: str) -> None:
+        self._set(chat_id, status)
+
+    def seen(self, chat_id: int) -> None:
+        """The user wrote to the bot, so the chat is reachable whatever happened before."""
+        entry = self.outcomes.get(str(chat_id))
+        if entry is not None and entry[0] != self.OK:
+            self._set(chat_id, None)
+
+    def reachable(self, chat_id: int) -> bool:
+        entry = self.outcomes.get(str(chat_id))
+        return entry is None or entry[0] == self.OK
+
+    def _write(self, outcomes: Dict[str, Tuple[str, int]]) -> None:
+        tmp_path = self.path + ".tmp"
+        json_write(tmp_path, outcomes, indent=False)
+        os.replace(tmp_path, self.path)
+
+    async def save(self) -> None:
+        # outcomes are immutable tuples, so a shallow copy is safe to encode in a thread
+        await asyncio.to_thread(self._write, dict(self.outcomes))
+
+
+class Checkpoint:
+    """
+    Persisted progress of one broadcast run: ``<run id>.json`` holds what is sent to whom and
+    ``<run id>.done`` the chats already dealt with, appended in batches of ``every``. Both
+    files are removed once the run completes; whatever is left over is an unfinished run.
+    """
+
+    def __init__(self, directory: str, run_id: str, every: int = RES.BROADCAST_CHECKPOINT_EVERY):
+        self.run_id = run_id
+        self.header_path = os.path.join(directory, run_id + ".json")
+        self.done_path = os.path.join(directory, run_id + ".done")
+        self.every = every
+        self._unsaved: List[int] = []
+
+    @classmethod
+    def create(cls, directory: str, name: str, method: str, kwargs: Dict[str, Any], audience: Iterable,
+               window: float = 0.0) -> "Checkpoint":
+        os.makedirs(directory, exist_ok=True)
+        run_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{name}-{uuid.uuid4().hex[:6]}"
+        checkpoint = cls(directory, run_id)
+        header = {
+            "name": name,
+            "method": method,
+            "kwargs": kwargs,
+            "audience": [int(c) for c in audience],
+            "started": time.time(),
+            "window": window
+        }
+        tmp_path = checkpoint.header_path + ".tmp"
+        json_write(tmp_path, header, indent=False)
+        os.replace(tmp_path, checkpoint.header_path)
+        return checkpoint
+
+    @classmethod
+    def pending(cls, directory: str) -> List["Checkpoint"]:
+        """Unfinished runs, oldest first."""
+        if not os.path.isdir(directory):
+            return []
+        return [cls(directory, name[:-len(".json")]) for name in sorted(os.listdir(directory))
+                if name.endswith(".json")]
+
+    def header(self) -> Dict[str, Any]:
+        return json_read(self.header_path)
+
+    def done(self) -> Set[int]:
+        if not os.path.exists(self.done_path):
+            return set()
+        with open(self.done_path, 'r', encoding='utf-8') as f:
+            # a torn last line is a chat that was never recorded, so it is sent again
+            return {int(line) for line in f if line.strip().isdigit() and line.endswith("\n")}
+
+    def mark(self, chat_id: int) -> None:
+        self._unsaved.append(chat_id)
+        if len(self._unsaved) >= self.every:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._unsaved:
+            return
+        with open(self.done_path, 'a', encoding='utf-8') as f:
+            f.write("".join(f"{chat_id}\n" for chat_id in self._unsaved))
+            f.flush()
+            os.fsync(f.fileno())
+        self._unsaved.clear()
+
+    def finish(self) -> None:
+        for path in (self.header_path, self.done_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+class Broadcaster:
+    """
+    Delivers one message to many chats through a token bucket shared by every broadcast,
+    tuned below Telegram's global limit, while keeping consecutive messages to the same chat
+    at least ``chat_interval`` apart. At most ``concurrency`` requests are in flight, and a
+    ``RetryAfter`` pauses all senders for as long as Telegram asks before retrying. Sends are
+    marked as bulk, so interactive replies go ahead of them in the outbound queue.
+
+    ``broadcast`` additionally checkpoints every run under ``directory``, so runs cut short by
+    a restart are picked up by ``resume_pending`` with only the chats not yet dealt with.
+    Every outcome is recorded in ``delivery``, and chats it knows to be dead are skipped.
+    """
+
+    def __init__(self, bot, delivery: DeliveryLog, rate: float = RES.BROADCAST_RATE,
+                 concurrency: int = RES.BROADCAST_CONCURRENCY, chat_interval: float = RES.BROADCAST_CHAT_INTERVAL_S,
+                 retries: int = RES.BROADCAST_RETRIES, directory: str = RES.BROADCAST_DIR):
+        self.bot = bot
+        self.delivery = delivery
+        self.directory = directory
+        self.bucket = TokenBucket(rate, capacity=rate)
+        self.concurrency = concurrency
+        self.chat_interval = chat_interval
+        self.retries = retries
+        self._chat_next: Dict[int, float] = {}
+        self._active: Set[str] = set()
+
+    async def _chat_slot(self, chat_id: int) -> None:
+        now = time.monotonic()
+        ready = self._chat_next.get(chat_id, 0.0)
+        self._chat_next[chat_id] = max(now, ready) + self.chat_interval
+        if ready > now:
+            await asyncio.sleep(ready - now)
+
+    async def _deliver(self, chat_id: int, send: Callable[[int], Awaitable], result: BroadcastResult) -> None:
+        for attempt in range(self.retries + 1):
+            await self._chat_slot(chat_id)
+            await self.bucket.acquire()
+            try:
+                await send(chat_id)
+            except error.RetryAfter as e:
+                wait = _seconds(e.retry_after)
+                log.warning(f"flood limit hit at chat {chat_id}; pausing broadcasts for {wait}s")
+                self.bucket.pause(wait)
+                continue
+            except error.TimedOut:
+                continue
+            except error.TelegramError as e:
+                status = self.delivery.classify(e)
+                if status == DeliveryLog.BLOCKED:
+                    result.blocked += 1
+                elif status == DeliveryLog.DELETED:
+                    result.deleted += 1
+                else:
+                    log.info(f"broadcast to {chat_id} failed: {e}")
+                    result.failed += 1
+                if status is not None:
+                    self.delivery.refused(chat_id, status)
+                return
+            self.delivery.delivered(chat_id)
+            result.sent += 1
+            return
+        result.failed += 1
+
+    async def run(self, chat_ids: Iterable, send: Callable[[int], Awaitable],
+                  on_done: Optional[Callable[[int], None]] = None,
+                  window: float = 0.0, window_start: Optional[float] = None,
+                  on_progress: Optional[Callable[[BroadcastResult, int], Awaitable]] = None) -> BroadcastResult:
+        """
+        Calls ``send(chat_id)`` for every chat and returns what became of them. ``on_progress``
+        receives the running result and the audience size every ``BROADCAST_PROGRESS_S`` seconds.
+
+        With a ``window`` of seconds, counted from the ``window_start`` timestamp (now by
+        default), each chat is due at its ``window_slot`` within it, and the run as a whole is
+        paced at the rate that fits its audience into the window.
+        """
+        result = BroadcastResult()
+        started = time.monotonic()
+        audience = [int(chat_id) for chat_id in chat_ids]
+        chat_ids = [chat_id for chat_id in audience if self.delivery.reachable(chat_id)]
+        result.skipped = len(audience) - len(chat_ids)
+        if window:
+            chat_ids = sorted(chat_ids, key=window_slot)
+            window_start = time.time() if window_start is None else window_start
+            # a little headroom so hash clumps do not push the tail past the window
+            pace = TokenBucket(rate=max(1.0, 1.2 * len(chat_ids) / window), capacity=1)
+        pending = iter(chat_ids)
+
+        async def worker():
+            for chat_id in pending:
+                if window:
+                    due = window_start + window_slot(chat_id) * window - time.time()
+                    if due > 0:
+                        await asyncio.sleep(due)
+                    await pace.acquire()
+                await self._deliver(chat_id, send, result)
+                if on_done is not None:
+                    on_done(chat_id)
+
+        async def reporter():
+            while True:
+                await asyncio.sleep(RES.BROADCAST_PROGRESS_S)
+                try:
+                    await on_progress(result, len(chat_ids))
+                except error.TelegramError as e:
+                    log.info(f"broadcast progress update failed: {e}")
+
+        progress = asyncio.create_task(reporter()) if on_progress is not None else None
+        try:
+            await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        finally:
+            if progress is not None:
+                progress.cancel()
+            await self.delivery.save()
+        result.elapsed = time.monotonic() - started
+        self._chat_next = {k: v for k, v in self._chat_next.items() if v > time.monotonic()}
+        return result
+
+    async def _run_checkpointed(self, checkpoint: Checkpoint,
+                                on_progress: Optional[Callable[[BroadcastResult, int], Awaitable]] = None
+                                ) -> BroadcastResult:
+        header = checkpoint.header()
+        send = getattr(self.bot, header["method"])
+        done = checkpoint.done()
+        remaining = [chat_id for chat_id in header["audience"] if chat_id not in done]
+        # set before the first await, so resume_pending never sees this run as unfinished
+        self._active.add(checkpoint.run_id)
+        try:
+            result = await self.run(remaining,
+                                    lambda chat_id: send(chat_id=chat_id, rate_limit_args=BULK_REQUEST,
+                                                         **header["kwargs"]),
+                                    checkpoint.mark,
+                                    header.get("window", 0.0),
+                                    header.get("started"),
+                                    on_progress)
+        finally:
+            # also on cancellation at shutdown, so the next start resumes right here
+            checkpoint.flush()
+            self._active.discard(checkpoint.run_id)
+        checkpoint.finish()
+        log.info(f"broadcast {checkpoint.run_id}: {result} ({len(done)} done before resuming)")
+        return result
+
+    async def broadcast(self, name: str, chat_ids: Iterable, method: str = "send_message",
+                        window: float = 0.0, on_progress=None, **kwargs) -> BroadcastResult:
+        """
+        Resumable run of ``bot.<method>(chat_id=..., **kwargs)`` for every chat, spread over
+        ``window`` seconds if given; ``kwargs`` are persisted with the run, so they must be
+        JSON serializable.
+        """
+        checkpoint = Checkpoint.create(self.directory, name, method, kwargs, chat_ids, window)
+        return await self._run_checkpointed(checkpoint, on_progress)
+
+    async def resume_pending(self) -> None:
+        for checkpoint in Checkpoint.pending(self.directory):
+            # runs started in this process are still going, or have finished since the listing
+            if checkpoint.run_id in self._active or not os.path.exists(checkpoint.header_path):
+                continue
+            log.info(f"resuming broadcast {checkpoint.run_id}")
+            try:
+                await self._run_checkpointed(checkpoint)
+            except (OSError, ValueError, KeyError) as e:
+                log.error(f"cannot resume broadcast {checkpoint.run_id}: {e}")
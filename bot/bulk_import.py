@@ -0,0 +1,135 @@
+import io
+from typing import Any, Dict, List, Tuple
+import pandas as pd
+from .construct import RES
+
+
+LIST_FIELDS = ("skills", "interests")
+TRUE_VALUES = ("1", "true", "yes")
+
+
+def read_table(data: bytes, filename: str) -> pd.DataFrame:
+    buffer = io.BytesIO(data)
+    if filename.lower().endswith((".xlsx", ".xls")):
+        return pd.read_excel(buffer, dtype=str, engine="openpyxl")
+    return pd.read_csv(buffer, dtype=str, encoding="utf-8-sig")
+
+
+def _normalized(column: pd.Series) -> pd.Series:
+    """Vectorized counterpart of the credential index normalization; blanks become NA."""
+    text = column.astype("string").str.lower().str.strip()
+    return text.mask(text.isin(["", "0"]))
+
+
+def _split_list(column: pd.Series) -> pd.Series:
+    # the same splitting as ProfileManager._normalize_list_field
+    return column.fillna("").str.split(",").map(lambda items: [i.strip() for i in items if i.strip()])
+
+
+def _key_frame(columns: Dict[str, pd.Series], groups) -> pd.DataFrame:
+    """Long frame of (row, group, key) for every complete credential key of every row."""
+    frames = []
+    for group_no, (attrs, _) in enumerate(groups):
+        parts = [columns[attr] for attr in attrs]
+        key = parts[0]
+        for part in parts[1:]:
+            key = key + "\x1f" + part
+        frame = pd.DataFrame({"row": key.index, "group": group_no, "key": key.to_numpy()}).dropna()
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
+
+
+def _weighted_matches(pairs: pd.DataFrame, left: str, right: str, groups) -> pd.DataFrame:
+    """Pairs whose summed group weights reach a duplicate (score >= 1.0)."""
+    weights = pd.Series([weight for _, weight in groups])
+    pairs = pairs.assign(weight=pairs["group"].map(weights))
+    scores = pairs.groupby([left, right], sort=False)["weight"].sum()
+    return scores[scores >= 1.0].reset_index()
+
+
+def prepare_import(table: pd.DataFrame,
+                   existing: List[Tuple[int, Tuple[str, ...], str]],
+                   existing_ids: set,
+                   groups) -> Tuple[Dict[str, Dict[str, Any]], List[Tuple[int, str]]]:
+    """
+    Validates a spreadsheet of new members column by column.
+
+    ``existing`` holds the (group, key, user id) entries of the credential index and ``groups``
+    its weighted groups; duplicates inside the file and against current members are found
+    with hash joins on those keys rather than one duplicate check per row. Returns the
+    records to add, keyed by user id, and ``(spreadsheet row, reason)`` for every rejected row.
+    Imported members are signed up but only verified where the optional ``is_verified``
+    column says so.
+    """
+    table = table.rename(columns=lambda c: str(c).strip())
+    required = ["user_id", *RES.REQUIRED_FIELDS.keys()]
+    missing = [c for c in required if c not in table.columns]
+    if missing:
+        return {}, [(1, f"missing columns: {', '.join(missing)}")]
+
+    table = table.reset_index(drop=True)
+    errors = pd.Series("", index=table.index)
+
+    def reject(mask: pd.Series, reason: str) -> None:
+        mask = mask & (errors == "")
+        errors[mask] = reason
+
+    def reject_each(reasons: pd.Series) -> None:
+        reasons = reasons.reindex(errors.index)
+        mask = reasons.notna() & (errors == "")
+        errors[mask] = reasons[mask]
+
+    # types from required_fields_check: ints are parsed, strings must not be blank
+    values: Dict[str, pd.Series] = {}
+    for field_name, example in {"user_id": 0, **RES.REQUIRED_FIELDS}.items():
+        raw = table[field_name].astype("string").str.strip()
+        if isinstance(example, int):
+            parsed = pd.to_numeric(raw, errors="coerce")
+            reject(parsed.isna() | (parsed % 1 != 0), f"'{field_name}' must be int")
+            values[field_name] = parsed.fillna(0).astype("int64")
+        else:
+            reject(raw.isna() | (raw == ""), f"'{field_name}' is required")
+            values[field_name] = raw.fillna("")
+    for field_name in LIST_FIELDS:
+        values[field_name] = _split_list(table[field_name]) if field_name in table.columns \
+            else pd.Series([[] for _ in table.index], index=table.index)
+    if "is_verified" in table.columns:
+        values["is_verified"] = table["is_verified"].astype("string").str.strip().str.lower().isin(TRUE_VALUES)
+    else:
+        values["is_verified"] = pd.Series(False, index=table.index)
+
+    ids = values["user_id"].astype(str)
+    reject(ids.isin(existing_ids), "user_id is already a member")
+    reject(ids.duplicated(keep="first"), "user_id repeated in the file")
+
+    attrs = {attr for attr_group, _ in groups for attr in attr_group}
+    normalized = {attr: _normalized(values[attr].astype(str)) for attr in attrs}
+    keys = _key_frame(normalized, groups)
+    # rows already rejected must not make others look like duplicates
+    keys = keys[keys["row"].isin(errors.index[errors == ""])]
+
+    # duplicates inside the file: a later row matching an earlier one is rejected
+    inner = keys.merge(keys, on=["group", "key"], suffixes=("_a", "_b"))
+    inner = inner[inner["row_a"] < inner["row_b"]]
+    if not inner.empty:
+        dup = _weighted_matches(inner, "row_a", "row_b", groups)
+        first = dup.groupby("row_b")["row_a"].min()
+        reject_each("duplicate of row " + (first + 2).astype(str))
+
+    # duplicates of current members
+    if existing:
+        members = pd.DataFrame(existing, columns=["group", "key", "user"])
+        members["key"] = members["key"].map("\x1f".join)
+        outer = keys.merge(members, on=["group", "key"])
+        if not outer.empty:
+            dup = _weighted_matches(outer, "row", "user", groups)
+            reject_each("matches existing member " + dup.groupby("row")["user"].first())
+
+    records = {}
+    for row in table.index[errors == ""]:
+        record = {field_name: column[row] for field_name, column in values.items()}
+        record = {k: (v.item() if hasattr(v, "item") else v) for k, v in record.items()}
+        record["is_signed_up"] = True
+        records[str(record["user_id"])] = record
+    report = [(int(row) + 2, reason) for row, reason in errors[errors != ""].items()]
+    return records, report
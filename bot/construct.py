@@ -14,12 +14,41 @@ class Config:
     GROUP_ID = int(os.getenv("GROUP_ID"))
     G_ID_TA = os.getenv("G_TOPIC_ID_A")
     G_ID_TB = os.getenv("G_TOPIC_ID_B")
+    STORAGE = os.getenv("STORAGE", "journal")
+    # "msgpack": journal snapshots are mirrored in that binary format for faster startup
+    SNAPSHOT_CODEC = os.getenv("SNAPSHOT_CODEC")
+    # connection pools: getUpdates, replies to users, and broadcasts / background jobs
+    UPDATES_POOL_SIZE = int(os.getenv("UPDATES_POOL_SIZE", 1))
+    UPDATES_READ_TIMEOUT = float(os.getenv("UPDATES_READ_TIMEOUT", 10))
+    INTERACTIVE_POOL_SIZE = int(os.getenv("INTERACTIVE_POOL_SIZE", 8))
+    INTERACTIVE_POOL_TIMEOUT = float(os.getenv("INTERACTIVE_POOL_TIMEOUT", 3))
+    INTERACTIVE_READ_TIMEOUT = float(os.getenv("INTERACTIVE_READ_TIMEOUT", 5))
+    BULK_POOL_SIZE = int(os.getenv("BULK_POOL_SIZE", 8))
+    BULK_POOL_TIMEOUT = float(os.getenv("BULK_POOL_TIMEOUT", 30))
+    BULK_READ_TIMEOUT = float(os.getenv("BULK_READ_TIMEOUT", 15))
+    # webhook mode (run.py --webhook): the local server the reverse proxy forwards to, and the
+    # public URL registered with Telegram; without WEBHOOK_URL nothing is registered
+    WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "127.0.0.1")
+    WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", 8443))
+    WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "webhook")
+    WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+    WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+    WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", 40))
 
 
 class RES:
     DATABASE_PATH = "./data/database.json"
+    JOURNAL_PATH = "./data/database.journal"
+    JOURNAL_COMPACT_BYTES = 1 << 20
+    SQLITE_PATH = "./data/database.sqlite3"
+    MIGRATIONS_DIR = "./data/migrations"
+    FLUSH_INTERVAL_MS = 500
+    PROFILE_CACHE_SIZE = 1024
+    SNAPSHOT_DIR = "./data/snapshots"
+    SNAPSHOT_KEEP = 5
+    SNAPSHOT_INTERVAL_S = 3600
     EXPORT_PATH = "./data/users_data.xlsx"
-    DATABASE = json_read(DATABASE_PATH)
+    EXPORT_FORMAT = "xlsx"
     _RESOURCE: dict = json_read("./data/resources.json")
     TEMPS: dict = _RESOURCE.get("temps")
     TIPS: dict = _RESOURCE.get("writing_tips")
@@ -31,10 +60,28 @@ class RES:
     NOTIF_TIME_H = 11
     NOTIF_TIME_D = 3
     NOTIF_TIME_M = 0
+    # reminders go out over this many seconds from the notification time
+    NOTIF_WINDOW_S = 20 * 60
+    # Telegram allows about 30 messages per second overall and one per second per chat
+    BROADCAST_RATE = 25
+    BROADCAST_CONCURRENCY = 8
+    BROADCAST_CHAT_INTERVAL_S = 1.0
+    BROADCAST_RETRIES = 3
+    BROADCAST_DIR = "./data/broadcasts"
+    BROADCAST_CHECKPOINT_EVERY = 20
+    DELIVERY_PATH = "./data/delivery.json"
+    BROADCAST_PROGRESS_S = 3
+    # Bot API calls running at once, and how many of them bulk sends must leave to replies
+    OUTBOUND_MAX_IN_FLIGHT = 8
+    OUTBOUND_RESERVED = 2
+    # how often a connection pool that made requests wait reports it
+    POOL_REPORT_S = 60
     LABEL_CALLBACK_MAP = {}
     STEP_FIELDS = list(CREDS_FA.keys())
     MULTI_FIELDS = {"skills", "interests"}
     CHOOSE_FIELDS = {"skills", "interests", "study_field", "degree", "university"}
+    SEARCH_PAGE_SIZE = 10
+    TEAMMATES_COUNT = 5
 
     @classmethod
     async def update(cls, key, value):
@@ -65,4 +112,8 @@ class States(Enum):
     CONTENT_OPTIONS = auto()
     WRITING_TIPS = auto()
     FINALIZE = auto()
-    EDIT_OPTION = auto()
\ No newline at end of file
+    EDIT_OPTION = auto()
+    MEMBER_SEARCH = auto()
+    BULK_IMPORT = auto()
+    ANNOUNCE_COMPOSE = auto()
+    ANNOUNCE_AUDIENCE = auto()
\ No newline at end of file
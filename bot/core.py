@@ -1,39 +1,113 @@
 #  start of something wonderful!
-from telegram.ext import ApplicationBuilder
+import logging
+from telegram.ext import ApplicationBuilder, ExtBot, Updater
 from .construct import Config, RES
 from .handlers import register
 from .profiles import ProfileManager
+from .storage import open_store
+from .snapshots import snapshot_job
+from .broadcast import Broadcaster, DeliveryLog
+from .outbound import PriorityRateLimiter, PooledRequest
+
+
+log = logging.getLogger(__name__)
 
 
 async def send_updated_msg(app):
+    await app.bot_data['broadcaster'].broadcast(
+        "updated",
+        app.bot_data.get('profile_manager').user_ids(),
+        text=(
+            "ربات آپدیت شد، برای استفاده دوباره استارت بزنید:  "
+            "/start")
+    )
+
+
+class LocalUpdater(Updater):
+    """
+    Serves the webhook endpoint without registering it with Telegram, so recorded updates can be
+    POSTed to it (benchmarks/replay_updates.py). Whatever webhook Telegram had is left alone.
+    """
+
+    def __init__(self, bot, update_queue):
+        # _bootstrap is private to python-telegram-bot; if an upgrade renamed it, the override
+        # below would do nothing and the local address would be registered with Telegram
+        if not callable(getattr(Updater, "_bootstrap", None)):
+            raise RuntimeError("Updater._bootstrap is missing from this python-telegram-bot version; "
+                               "set WEBHOOK_URL or update LocalUpdater")
+        super().__init__(bot, update_queue)
 
-    for usr_id in app.bot_data.get('profile_manager').user_ids():
-        try:
-            await app.bot.send_message(chat_id=usr_id,
-                                       text=(
-                                           "ربات آپدیت شد، برای استفاده دوباره استارت بزنید:  "
-                                           "/start"))
-        except error.BadRequest:
-            print(f"chat {usr_id} not found to send updated message")
+    async def _bootstrap(self, *args, **kwargs) -> None:
+        log.info("WEBHOOK_URL is not set; serving the webhook without registering it with Telegram")
 
 
 class TelegramBot:
 
     def __init__(self, updated=False):
-        self.app = ApplicationBuilder().token(Config.TOKEN).build()
+        limiter = PriorityRateLimiter()
+        updates_request = PooledRequest("updates", Config.UPDATES_POOL_SIZE,
+                                        read_timeout=Config.UPDATES_READ_TIMEOUT)
+        interactive_request = PooledRequest("interactive", Config.INTERACTIVE_POOL_SIZE,
+                                            pool_timeout=Config.INTERACTIVE_POOL_TIMEOUT,
+                                            read_timeout=Config.INTERACTIVE_READ_TIMEOUT)
+        # broadcasts and other background sends get their own connections, so a long run
+        # never leaves a reply waiting for one
+        bulk_request = PooledRequest("bulk", Config.BULK_POOL_SIZE,
+                                     pool_timeout=Config.BULK_POOL_TIMEOUT,
+                                     read_timeout=Config.BULK_READ_TIMEOUT)
+        self.app = (
+            ApplicationBuilder()
+            .token(Config.TOKEN)
+            .request(interactive_request)
+            .get_updates_request(updates_request)
+            .rate_limiter(limiter)
+            .build()
+        )
+        self.bulk_bot = ExtBot(Config.TOKEN, request=bulk_request, get_updates_request=bulk_request,
+                               rate_limiter=limiter)
+        self.app.bot_data['broadcaster'] = Broadcaster(self.bulk_bot, DeliveryLog(RES.DELIVERY_PATH))
+        self.app.bot_data['pools'] = [updates_request, interactive_request, bulk_request]
         self.updated = updated
 
     def load_profiles(self):
-        self.app.bot_data['profile_manager'] = ProfileManager(RES.DATABASE)
+        store = open_store(Config.STORAGE,
+                           RES.DATABASE_PATH,
+                           RES.JOURNAL_PATH,
+                           RES.SQLITE_PATH,
+                           RES.JOURNAL_COMPACT_BYTES,
+                           Config.SNAPSHOT_CODEC)
+        self.app.bot_data['profile_manager'] = ProfileManager(store, migrations_dir=RES.MIGRATIONS_DIR)
+        snapshot_job(self.app)
 
     def register_handlers(self):
         register(self.app)
 
     async def post_run_actions(self, app):
+        await self.bulk_bot.initialize()
+        app.bot_data['profile_manager'].start_flusher()
+        # broadcasts cut short by the last shutdown carry on in the background
+        app.create_task(app.bot_data['broadcaster'].resume_pending())
         if self.updated:
             await send_updated_msg(app)
 
+    async def shutdown_actions(self, app):
+        await app.bot_data['profile_manager'].close()
+        await self.bulk_bot.shutdown()
 
-    def run(self) -> None:
+    def run(self, webhook: bool = False) -> None:
         self.app.post_init = self.post_run_actions
-        self.app.run_polling()
+        self.app.post_shutdown = self.shutdown_actions
+        if not webhook:
+            self.app.run_polling()
+            return
+        if not Config.WEBHOOK_URL:
+            self.app.updater = LocalUpdater(self.app.bot, self.app.update_queue)
+        # requests without the matching X-Telegram-Bot-Api-Secret-Token header are refused
+        self.app.run_webhook(
+            listen=Config.WEBHOOK_LISTEN,
+            port=Config.WEBHOOK_PORT,
+            url_path=Config.WEBHOOK_PATH,
+            webhook_url=Config.WEBHOOK_URL,
+            secret_token=Config.WEBHOOK_SECRET,
+            max_connections=Config.WEBHOOK_MAX_CONNECTIONS
+        )
@@ -0,0 +1,212 @@
+import asyncio
+import csv
+import io
+import os
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+from openpyxl import Workbook
+from telegram import error
+from .construct import RES
+from .utility import json_loads
+
+
+EXPORT_CHUNK_ROWS = 500
+
+
+def _row(record: Dict[str, Any], columns: List[str]) -> List[Any]:
+    row = []
+    for column in columns:
+        value = record.get(column)
+        if isinstance(value, list):
+            # lists become comma-separated strings
+            value = ", ".join(map(str, value))
+        row.append(value)
+    return row
+
+
+class _XlsxWriter:
+    """Write-only workbook: rows are streamed to a temporary file instead of kept as cells."""
+
+    extension = "xlsx"
+
+    def __init__(self):
+        self._columns = list(RES.CREDS_FA.keys())
+        self._book = Workbook(write_only=True)
+        self._sheet = self._book.create_sheet()
+        self._sheet.append(self._columns)
+
+    def write(self, records: List[Dict[str, Any]]) -> None:
+        for record in records:
+            self._sheet.append(_row(record, self._columns))
+
+    def finish(self) -> io.BytesIO:
+        buffer = io.BytesIO()
+        self._book.save(buffer)
+        buffer.seek(0)
+        return buffer
+
+
+class _CsvWriter:
+    extension = "csv"
+
+    def __init__(self):
+        self._columns = list(RES.CREDS_FA.keys())
+        self._buffer = io.BytesIO()
+        # utf-8-sig so Excel shows the Persian text correctly
+        self._text = io.TextIOWrapper(self._buffer, encoding='utf-8-sig', newline='')
+        self._csv = csv.writer(self._text)
+        self._csv.writerow(self._columns)
+
+    def write(self, records: List[Dict[str, Any]]) -> None:
+        self._csv.writerows(_row(record, self._columns) for record in records)
+
+    def finish(self) -> io.BytesIO:
+        self._text.flush()
+        self._text.detach()
+        self._buffer.seek(0)
+        return self._buffer
+
+
+# every profile field; the few categorical ones are dictionary encoded
+_CATEGORY = pa.dictionary(pa.int32(), pa.string())
+ARROW_SCHEMA = pa.schema([
+    ("user_id", pa.int64()),
+    ("first_name", pa.string()),
+    ("last_name", pa.string()),
+    ("study_field", _CATEGORY),
+    ("student_id", pa.int64()),
+    ("email", pa.string()),
+    ("phone_number", pa.int64()),
+    ("degree", _CATEGORY),
+    ("university", _CATEGORY),
+    ("is_signed_up", pa.bool_()),
+    ("is_verified", pa.bool_()),
+    ("skills", pa.list_(pa.string())),
+    ("interests", pa.list_(pa.string())),
+    ("scale", pa.int32()),
+    ("self_reserve", pa.bool_()),
+])
+
+
+def _record_batch(records: List[Dict[str, Any]]) -> pa.RecordBatch:
+    arrays = []
+    for schema_field in ARROW_SCHEMA:
+        values = [record.get(schema_field.name) for record in records]
+        if pa.types.is_dictionary(schema_field.type):
+            arrays.append(pa.array(values, pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(values, schema_field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=ARROW_SCHEMA)
+
+
+class _ParquetWriter:
+    """Each chunk becomes one row group, so only the current chunk is held in memory."""
+
+    extension = "parquet"
+
+    def __init__(self):
+        self._buffer = io.BytesIO()
+        self._writer = pq.ParquetWriter(self._buffer, ARROW_SCHEMA, compression="zstd")
+
+    def write(self, records: List[Dict[str, Any]]) -> None:
+        self._writer.write_batch(_record_batch(records))
+
+    def finish(self) -> io.BytesIO:
+        self._writer.close()
+        self._buffer.seek(0)
+        return self._buffer
+
+
+class _FeatherWriter:
+    """
+    Feather files need one dictionary per column across the whole file, so the batches are
+    kept in their compact columnar form until the dictionaries are unified at the end.
+    """
+
+    extension = "feather"
+
+    def __init__(self):
+        self._batches: List[pa.RecordBatch] = []
+
+    def write(self, records: List[Dict[str, Any]]) -> None:
+        self._batches.append(_record_batch(records))
+
+    def finish(self) -> io.BytesIO:
+        table = pa.Table.from_batches(self._batches, schema=ARROW_SCHEMA).unify_dictionaries()
+        buffer = io.BytesIO()
+        feather.write_feather(table, buffer, compression="zstd")
+        buffer.seek(0)
+        return buffer
+
+
+WRITERS = {
+    "xlsx": _XlsxWriter,
+    "csv": _CsvWriter,
+    "parquet": _ParquetWriter,
+    "feather": _FeatherWriter
+}
+
+
+def export_filename(fmt: str) -> str:
+    return f"{os.path.splitext(os.path.basename(RES.EXPORT_PATH))[0]}.{WRITERS[fmt].extension}"
+
+
+def _records(cached: Dict[str, Optional[Dict[str, Any]]],
+             stored: Callable[[], Iterable[Tuple[str, bytes]]]) -> Iterator[Dict[str, Any]]:
+    for record in cached.values():
+        if record is not None:
+            yield record
+    for key, raw in stored():
+        if key not in cached:
+            yield json_loads(raw)
+
+
+def _write_all(writer_class, records: Iterator[Dict[str, Any]]) -> io.BytesIO:
+    writer = writer_class()
+    while chunk := list(islice(records, EXPORT_CHUNK_ROWS)):
+        writer.write(chunk)
+    return writer.finish()
+
+
+async def export_profiles_file(profile_manager, fmt: str = RES.EXPORT_FORMAT) -> io.BytesIO:
+    """
+    Builds the members export in memory. Only the cached profiles and a view of the store's
+    encoded records are taken on the loop; a worker thread decodes the stored records
+    EXPORT_CHUNK_ROWS at a time and writes each chunk before reading the next.
+    """
+    cached, stored = profile_manager.snapshot_source()
+    return await asyncio.to_thread(_write_all, WRITERS[fmt], _records(cached, stored))
+
+
+class ExportCache:
+    """
+    The last export and the Telegram ``file_id`` it was uploaded as, valid for as long as the
+    profile manager's data generation does not change.
+    """
+
+    def __init__(self):
+        self._key = None
+        self._data: Optional[bytes] = None
+        self._file_id: Optional[str] = None
+
+    async def send(self, bot, chat_id: int, profile_manager, fmt: str = RES.EXPORT_FORMAT):
+        # read before building, so changes made while the export runs invalidate its result
+        key = (profile_manager.generation, fmt)
+        if key == self._key:
+            if self._file_id:
+                try:
+                    return await bot.send_document(chat_id=chat_id, document=self._file_id)
+                except error.BadRequest:
+                    self._file_id = None
+        else:
+            buffer = await export_profiles_file(profile_manager, fmt)
+            self._key, self._data, self._file_id = key, buffer.getvalue(), None
+
+        sent = await bot.send_document(chat_id=chat_id,
+                                       document=io.BytesIO(self._data),
+                                       filename=export_filename(fmt))
+        self._file_id = sent.document.file_id
+        return sent
@@ -2,6 +2,8 @@ from .main_menu import *
 from .profile_edit import *
 from .content import *
 from .settings import *
+from .members import *
+from .announce import *
 from bot.register import register
 
 __all__ = (
@@ -9,5 +11,7 @@ __all__ = (
     content.__all__ +
     profile_edit.__all__ +
     settings.__all__ +
+    members.__all__ +
+    announce.__all__ +
     [register]
 )
\ No newline at end of file
@@ -24,12 +24,15 @@ def make_menu_keyboard(menu_type, reserve=False):
         'student':
             [
                 [_reply_button('12'), _reply_button('25')],
+                [_reply_button('36')],
                 [_reply_button('13'), _reply_button('30')]
             ],
         'admin':
             [
                 [_reply_button('12'), _reply_button('25')],
-                [_reply_button('24'), _reply_button('13'), _reply_button('30')]
+                [_reply_button('24'), _reply_button('33'), _reply_button('37')],
+                [_reply_button('38'), _reply_button('39'), _reply_button('36')],
+                [_reply_button('13'), _reply_button('30')]
             ],
         'settings':
             [
@@ -53,6 +56,10 @@ def make_menu_keyboard(menu_type, reserve=False):
                 [_reply_button('2')]
 
             ],
+        'back':
+            [
+                [_reply_button('2')]
+            ],
         'skills': _reply_buttons('skills'),
         'interests': _reply_buttons('interests'),
         'temps': temps,
@@ -63,7 +70,7 @@ def make_menu_keyboard(menu_type, reserve=False):
     return ReplyKeyboardMarkup(buttons, resize_keyboard=True, one_time_keyboard=False)
 
 
-def make_menu_inline(menu_types, user_id=None):
+def make_menu_inline(menu_types, user_id=None, page=0, pages=1):
     if isinstance(menu_types, str):
         menu_types = [menu_types]
     labels = RES.LABELS
@@ -118,7 +125,8 @@ def make_menu_inline(menu_types, user_id=None):
         'profile_edit_general_options':
             [
                 [_button('2', labels['2'])]
-            ]
+            ],
+        'search_pages': _page_buttons('member_search', page, pages)
     }
     buttons = []
     for menu_type in menu_types:
@@ -126,6 +134,28 @@ def make_menu_inline(menu_types, user_id=None):
     return InlineKeyboardMarkup(buttons)
 
 
+def make_announce_menu(titles, criteria):
+    """Audience picker: one button per field with the number of values picked in it."""
+    buttons = []
+    for field, title in titles.items():
+        picked = len(criteria.get(field, ()))
+        label = f"{title} ({picked})" if picked else title
+        buttons.append(InlineKeyboardButton(label, callback_data=f"announce:field:{field}"))
+    rows = [buttons[i:i + 2] for i in range(0, len(buttons), 2)]
+    rows.append([_button('41', 'announce:clear'), _button('40', 'announce:send')])
+    return InlineKeyboardMarkup(rows)
+
+
+def make_announce_values(field, values, selected):
+    """``values`` are (value, label, count); callbacks carry the position, values can be too long."""
+    rows = []
+    for i, (value, label, count) in enumerate(values):
+        mark = "✅ " if value in selected else ""
+        rows.append([InlineKeyboardButton(f"{mark}{label} ({count})", callback_data=f"announce:pick:{field}:{i}")])
+    rows.append([_button('2', 'announce:menu')])
+    return InlineKeyboardMarkup(rows)
+
+
 def _reply_buttons(buttons_n):
     if isinstance(buttons_n, str):
         buttons_label = RES.LABELS[buttons_n]
@@ -173,6 +203,15 @@ def _buttons(
     return buttons
 
 
+def _page_buttons(base_tag, page, pages):
+    row = []
+    if page > 0:
+        row.append(_button('35', f'{base_tag}:{page - 1}'))
+    if page < pages - 1:
+        row.append(_button('34', f'{base_tag}:{page + 1}'))
+    return [row] if row else []
+
+
 def _button(label, callback_data):
     return InlineKeyboardButton(RES.LABELS[label], callback_data=callback_data)
 
@@ -1,3 +1,4 @@
+from collections import defaultdict
 from telegram.ext import (
     ContextTypes
 )
@@ -119,7 +120,7 @@ def decode_label(label: str, label_map) -> str:
     for label_n, code in label_map.items():
         if code == label:
             return label_n
-    raise ValueError(f"Unknown encoded callback data: {encoded}")
+    raise ValueError(f"Unknown encoded callback data: {label}")
 
 
 def apply_entities(text: str, entities: list[MessageEntity]) -> str:
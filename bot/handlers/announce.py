@@ -0,0 +1,183 @@
+from html import escape
+from telegram import (
+    Update,
+    error
+)
+from telegram.ext import (
+    ContextTypes
+)
+from ._utils import (
+    push_menu,
+    _del_res,
+    apply_entities
+)
+from ._make_menus import (
+    make_menu_keyboard,
+    make_announce_menu,
+    make_announce_values
+)
+from .main_menu import start
+from .members import STATUS_FA
+from ..construct import (
+    States,
+    RES
+)
+from ..outbound import BULK_REQUEST
+
+
+FIELDS = ("university", "degree", "study_field", "skills", "interests", "status")
+
+
+def _titles():
+    return {field: RES.LABELS['42'] if field == "status" else RES.CREDS_FA[field] for field in FIELDS}
+
+
+def _field_values(context: ContextTypes.DEFAULT_TYPE, field: str):
+    """(value, label, count) for every value the field currently has, most common first."""
+    counts = context.bot_data.get('profile_manager').stats.counts[field]
+    if field == "status":
+        return [(value, STATUS_FA.get(value, value), count) for value, count in counts.most_common()]
+    return [(value, value, count) for value, count in counts.most_common()]
+
+
+def _audience_menu(context: ContextTypes.DEFAULT_TYPE):
+    criteria = context.user_data['announce_criteria']
+    size = len(context.bot_data.get('profile_manager').audience(criteria))
+    titles = _titles()
+    lines = ["<b>مخاطبان پیام</b>"]
+    for field, values in criteria.items():
+        labels = [STATUS_FA.get(v, v) for v in values] if field == "status" else values
+        lines.append(f"| {titles[field]} : {escape(', '.join(labels))}")
+    if not criteria:
+        lines.append("| همه‌ی اعضا")
+    lines.append(f"\nتعداد مخاطبان: <code>{size}</code> نفر")
+    return "\n".join(lines), make_announce_menu(titles, criteria)
+
+
+def _values_menu(context: ContextTypes.DEFAULT_TYPE, field: str):
+    values = _field_values(context, field)
+    # the positions in the buttons refer to this list
+    context.user_data['announce_values'] = {field: [value for value, _, _ in values]}
+    selected = context.user_data['announce_criteria'].get(field, [])
+    text = f"<b>{_titles()[field]}</b>\nیک یا چند مورد رو انتخاب کن."
+    return text, make_announce_values(field, values, selected)
+
+
+def _progress_text(result, total: int) -> str:
+    return (
+        f"📣 در حال ارسال: <code>{result.done}</code> از <code>{total}</code>\n"
+        f"✅ {result.sent} | 🚫 {result.blocked} | 🗑 {result.deleted} | ⚠️ {result.failed}"
+    )
+
+
+async def on_announce(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user_id = update.effective_user.id
+    msg = update.message
+    context.user_data['announce_criteria'] = {}
+    text = (
+        "<b>اطلاع‌رسانی</b>\n"
+        "متن پیام رو بفرست؛ قالب‌بندی متن حفظ میشه."
+    )
+    await _del_res(user_id, msg, text, context, reply_markup=make_menu_keyboard('back'))
+    return push_menu(context, States.ANNOUNCE_COMPOSE)
+
+
+async def announce_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user_id = update.effective_user.id
+    msg = update.message
+    text = apply_entities(msg.text, list(msg.entities))
+    try:
+        # the preview doubles as a check that Telegram accepts the formatting
+        await context.bot.send_message(chat_id=user_id, text=text, parse_mode="HTML")
+    except error.BadRequest as e:
+        await context.bot.send_message(chat_id=user_id, text=f"قالب پیام معتبر نیست: {e.message}")
+        return States.ANNOUNCE_COMPOSE
+    context.user_data['announce_text'] = text
+    menu_text, keyboard = _audience_menu(context)
+    await context.bot.send_message(chat_id=user_id, text=menu_text, parse_mode="HTML", reply_markup=keyboard)
+    return push_menu(context, States.ANNOUNCE_AUDIENCE)
+
+
+async def on_announce_option(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await query.answer()
+    _, action, *args = query.data.split(':')
+    criteria = context.user_data['announce_criteria']
+    if action == 'field':
+        text, keyboard = _values_menu(context, args[0])
+    elif action == 'pick':
+        field, position = args[0], int(args[1])
+        value = context.user_data['announce_values'][field][position]
+        picked = criteria.setdefault(field, [])
+        if value in picked:
+            picked.remove(value)
+        else:
+            picked.append(value)
+        if not picked:
+            del criteria[field]
+        text, keyboard = _values_menu(context, field)
+    else:
+        if action == 'clear':
+            criteria.clear()
+        text, keyboard = _audience_menu(context)
+    await query.edit_message_text(text=text, parse_mode="HTML", reply_markup=keyboard)
+    return States.ANNOUNCE_AUDIENCE
+
+
+async def send_announcement(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await query.answer()
+    user_data = context.user_data
+    audience = context.bot_data.get('profile_manager').audience(user_data['announce_criteria'])
+    text = user_data['announce_text']
+    chat_id, message_id = query.message.chat_id, query.message.message_id
+
+    bulk_bot = context.bot_data['broadcaster'].bot
+
+    async def progress(result, total):
+        await bulk_bot.edit_message_text(chat_id=chat_id, message_id=message_id,
+                                         text=_progress_text(result, total), parse_mode="HTML",
+                                         rate_limit_args=BULK_REQUEST)
+
+    async def deliver():
+        result = await context.bot_data['broadcaster'].broadcast(
+            "announcement",
+            audience,
+            on_progress=progress,
+            text=text,
+            parse_mode="HTML"
+        )
+        summary = (
+            "✅ ارسال تمام شد\n"
+            f"ارسال موفق: {result.sent}\nمسدود کرده: {result.blocked}\nحساب حذف شده: {result.deleted}\n"
+            f"ناموفق: {result.failed}\nرد شده (غیرقابل دسترس): {result.skipped}"
+        )
+        try:
+            await context.bot.edit_message_text(chat_id=chat_id, message_id=message_id, text=summary)
+        except error.BadRequest:
+            await context.bot.send_message(chat_id=chat_id, text=summary)
+
+    await query.edit_message_text(text=f"📣 ارسال به {len(audience)} نفر شروع شد...")
+    # sent in the background, so the bot keeps answering while the announcement goes out
+    context.application.create_task(deliver(), update=update)
+    for var in ['announce_text', 'announce_criteria', 'announce_values']:
+        user_data.pop(var, None)
+    return await start(update, context)
+
+
+async def go_back_announce(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user_id = update.effective_user.id
+    msg = update.message
+    for var in ['announce_text', 'announce_criteria', 'announce_values']:
+        context.user_data.pop(var, None)
+    await context.bot.delete_message(chat_id=user_id, message_id=msg.message_id)
+    return await start(update, context)
+
+
+__all__ = [
+    'on_announce',
+    'announce_text',
+    'on_announce_option',
+    'send_announcement',
+    'go_back_announce'
+]
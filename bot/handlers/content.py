@@ -7,7 +7,8 @@ from telegram.ext import (
 from ._utils import (
     push_menu,
     pop_menu,
-    _del_res
+    _del_res,
+    apply_entities
 )
 from ..construct import (
     States,
@@ -15,6 +15,7 @@ from ..construct import (
     RES,
     Config
 )
+from ..export import ExportCache, WRITERS
 
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -100,12 +101,24 @@ async def about(update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int
 
 
 async def export_profiles(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    context.bot_data.get('profile_manager').export()
-    await context.bot.send_document(chat_id=Config.ADMIN_ID, document=RES.EXPORT_PATH)
+    export_cache = context.bot_data.setdefault('export_cache', ExportCache())
+    await export_cache.send(context.bot, Config.ADMIN_ID, context.bot_data.get('profile_manager'))
+
+
+async def export_profiles_as(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """``/export parquet`` (or feather, csv, xlsx) for the offline analysis notebooks."""
+    fmt = context.args[0].lower() if context.args else RES.EXPORT_FORMAT
+    if fmt not in WRITERS:
+        await context.bot.send_message(chat_id=Config.ADMIN_ID,
+                                       text=f"فرمت‌های قابل استفاده: {', '.join(WRITERS)}")
+        return
+    export_cache = context.bot_data.setdefault('export_cache', ExportCache())
+    await export_cache.send(context.bot, Config.ADMIN_ID, context.bot_data.get('profile_manager'), fmt)
 
 
 __all__ = [
     'about',
     'start',
-    'export_profiles'
+    'export_profiles',
+    'export_profiles_as'
 ]
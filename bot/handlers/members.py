@@ -0,0 +1,238 @@
+import asyncio
+import csv
+import io
+from html import escape
+from telegram import (
+    Update
+)
+from telegram.ext import (
+    ContextTypes
+)
+from ._utils import (
+    push_menu,
+    _del_res
+)
+from ._make_menus import (
+    make_menu_keyboard,
+    make_menu_inline
+)
+from .main_menu import start
+from ..construct import (
+    States,
+    RES
+)
+from ..bulk_import import read_table, prepare_import
+
+
+STATUS_FA = {"verified": "تایید شده", "signed_up": "در انتظار تایید", "incomplete": "ناقص"}
+
+
+async def on_member_search(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user_id = update.effective_user.id
+    msg = update.message
+    text = (
+        "<b>جستجوی اعضا</b>\n"
+        "بخشی از عنوان مهارت یا علاقه‌ی مورد نظر رو بفرست.\n"
+        "• برای «و» از <code>&amp;</code> استفاده کن: <code>ترجمه &amp; بیوتکنولوژی</code>\n"
+        "• برای «یا» از <code>|</code> استفاده کن: <code>ویراستاری | تولید محتوا</code>"
+    )
+    await _del_res(user_id, msg, text, context, reply_markup=make_menu_keyboard('back'))
+    return push_menu(context, States.MEMBER_SEARCH)
+
+
+def _search_page(context: ContextTypes.DEFAULT_TYPE, page: int):
+    profile_manager = context.bot_data.get('profile_manager')
+    results = context.user_data.get('search_results', [])
+    query = context.user_data.get('search_query', '')
+    size = RES.SEARCH_PAGE_SIZE
+    pages = max(1, -(-len(results) // size))
+    page = min(max(page, 0), pages - 1)
+
+    lines = [f"<b>نتایج «{escape(query)}»</b> : {len(results)} نفر (صفحه {page + 1} از {pages})\n"]
+    for n, uid in enumerate(results[page * size:(page + 1) * size], start=page * size + 1):
+        profile = profile_manager.get(uid)
+        if profile is None:
+            continue
+        lines.append(
+            f"{n}. <a href='tg://user?id={uid}'>{escape(profile.full_name())}</a> | {escape(profile.study_field)}\n"
+            f"     {escape(', '.join(profile.skills + profile.interests))}"
+        )
+    if not results:
+        lines.append("کسی پیدا نشد!")
+    return "\n".join(lines), make_menu_inline('search_pages', page=page, pages=pages)
+
+
+async def search_members(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user_id = update.effective_user.id
+    query = update.message.text.strip()
+    found = context.bot_data.get('profile_manager').tags.search(query)
+    context.user_data['search_results'] = sorted(found, key=int)
+    context.user_data['search_query'] = query
+    text, keyboard = _search_page(context, 0)
+    await context.bot.send_message(
+        chat_id=user_id,
+        text=text,
+        parse_mode="HTML",
+        reply_markup=keyboard
+    )
+    return States.MEMBER_SEARCH
+
+
+async def on_search_page(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await query.answer()
+    _, page = query.data.split(':')
+    text, keyboard = _search_page(context, int(page))
+    await query.edit_message_text(
+        text=text,
+        parse_mode="HTML",
+        reply_markup=keyboard
+    )
+    return States.MEMBER_SEARCH
+
+
+async def find_teammates(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user_id = update.effective_user.id
+    msg = update.message
+    profile_manager = context.bot_data.get('profile_manager')
+    profile = profile_manager.get(user_id)
+    suggestions = profile_manager.teammates.recommend(profile, RES.TEAMMATES_COUNT) if profile else []
+
+    lines = ["<b>هم‌تیمی‌های پیشنهادی</b>\n"]
+    for n, (uid, _) in enumerate(suggestions, start=1):
+        mate = profile_manager.get(uid)
+        if mate is None:
+            continue
+        shared = [i for i in mate.interests if i in profile.interests]
+        complement = [s for s in mate.skills if s not in profile.skills]
+        lines.append(f"{n}. <a href='tg://user?id={uid}'>{escape(mate.full_name())}</a> | {escape(mate.study_field)}")
+        if shared:
+            lines.append(f"     علایق مشترک: {escape(', '.join(shared))}")
+        if complement:
+            lines.append(f"     مهارت‌های مکمل: {escape(', '.join(complement))}")
+    if not suggestions:
+        lines.append("فعلا کسی پیدا نشد؛ مهارت‌ها و علایقت رو در پروفایل کامل کن.")
+
+    await _del_res(user_id, msg, "\n".join(lines), context)
+
+
+async def show_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user_id = update.effective_user.id
+    msg = update.message
+    counts = context.bot_data.get('profile_manager').stats.counts
+    titles = {
+        "status": "وضعیت",
+        "university": RES.CREDS_FA['university'],
+        "degree": RES.CREDS_FA['degree'],
+        "study_field": RES.CREDS_FA['study_field'],
+        "skills": RES.CREDS_FA['skills'],
+        "interests": RES.CREDS_FA['interests']
+    }
+    lines = [f"<b>{RES.LABELS['37']}</b> : {sum(counts['status'].values())} نفر"]
+    for field, title in titles.items():
+        lines.append(f"\n<b>{title}</b>")
+        for value, count in counts[field].most_common():
+            label = STATUS_FA.get(value, value) if field == "status" else value
+            lines.append(f"| {escape(str(label))} : <code>{count}</code>")
+
+    delivery = context.bot_data['broadcaster'].delivery.counts
+    lines.append("\n<b>وضعیت دریافت پیام</b>")
+    lines.append(f"| دریافت موفق : <code>{delivery['ok']}</code>")
+    lines.append(f"| ربات را مسدود کرده : <code>{delivery['blocked']}</code>")
+    lines.append(f"| حساب حذف شده : <code>{delivery['deleted']}</code>")
+
+    queues = context.bot.rate_limiter.queue_info()
+    lines.append("\n<b>صف ارسال</b>")
+    for name, info in queues.items():
+        lines.append(
+            f"| {name} : در صف <code>{info['waiting']}</code> | در حال ارسال <code>{info['in_flight']}</code> | "
+            f"انتظار میانگین <code>{info['avg_wait_ms']:.0f}ms</code> | بیشینه <code>{info['max_wait_ms']:.0f}ms</code>"
+        )
+
+    lines.append(f"\n<b>اتصال‌ها</b> (از {RES.POOL_REPORT_S} ثانیه‌ی اخیر)")
+    for pool in context.bot_data.get('pools', []):
+        info = pool.pool_info()
+        lines.append(
+            f"| {pool.name} : در حال استفاده <code>{info['in_use']}/{info['size']}</code> | "
+            f"بیشینه <code>{info['peak']}</code> | منتظر مانده <code>{info['waited']}</code> "
+            f"(<code>{info['max_wait_ms']:.0f}ms</code>) | تایم‌اوت <code>{info['timeouts']}</code>"
+        )
+    await _del_res(user_id, msg, "\n".join(lines), context)
+
+
+async def on_bulk_import(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user_id = update.effective_user.id
+    msg = update.message
+    columns = ", ".join(["user_id", *RES.REQUIRED_FIELDS.keys(), "skills", "interests"])
+    text = (
+        "<b>ورود گروهی اعضا</b>\n"
+        "فایل CSV یا XLSX اعضای جدید رو بفرست. ستون‌ها:\n"
+        f"<code>{columns}</code>\n"
+        "مهارت‌ها و علایق رو با کاما جدا کن.\n"
+        "اعضا تایید‌نشده اضافه می‌شن، مگر اینکه ستون اختیاری <code>is_verified</code> "
+        "برای اون ردیف <code>1</code> باشه."
+    )
+    await _del_res(user_id, msg, text, context, reply_markup=make_menu_keyboard('back'))
+    return push_menu(context, States.BULK_IMPORT)
+
+
+async def bulk_import_file(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user_id = update.effective_user.id
+    document = update.message.document
+    profile_manager = context.bot_data.get('profile_manager')
+
+    file = await document.get_file()
+    data = bytes(await file.download_as_bytearray())
+    try:
+        table = await asyncio.to_thread(read_table, data, document.file_name or "")
+    except Exception as e:
+        await context.bot.send_message(chat_id=user_id, text=f"فایل خوانده نشد: {e}")
+        return States.BULK_IMPORT
+
+    records, report = await asyncio.to_thread(
+        prepare_import,
+        table,
+        profile_manager.credential_entries(),
+        set(profile_manager.user_ids()),
+        profile_manager.credential_groups
+    )
+    if records:
+        await profile_manager.import_profiles(records)
+
+    verified = sum(record["is_verified"] for record in records.values())
+    await context.bot.send_message(
+        chat_id=user_id,
+        text=f"✅ {len(records)} عضو اضافه شد ({verified} تاییدشده)\n🚫 {len(report)} ردیف رد شد"
+    )
+    if report:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(["row", "error"])
+        writer.writerows(report)
+        await context.bot.send_document(
+            chat_id=user_id,
+            document=io.BytesIO(buffer.getvalue().encode('utf-8-sig')),
+            filename="import_errors.csv"
+        )
+    return States.BULK_IMPORT
+
+
+async def go_back_members(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user_id = update.effective_user.id
+    msg = update.message
+    for var in ['search_results', 'search_query']:
+        context.user_data.pop(var, None)
+    await context.bot.delete_message(chat_id=user_id, message_id=msg.message_id)
+    return await start(update, context)
+
+
+__all__ = [
+    'on_member_search',
+    'search_members',
+    'on_search_page',
+    'find_teammates',
+    'show_stats',
+    'on_bulk_import',
+    'bulk_import_file',
+    'go_back_members'
+]
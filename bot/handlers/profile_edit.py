@@ -12,12 +12,14 @@ from ._utils import (
     _outline_creds,
     decode_label,
     get_user_state,
+    recognize_user,
     push_menu,
     pop_menu
 )
 from ..construct import (
     States,
-    RES
+    RES,
+    Config
 )
 
 
@@ -192,12 +194,24 @@ async def end_signup(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     user_id = update.effective_user.id
     await query.answer()
-    profile = context.bot_data.get('profile_manager').get(user_id)
+    profile_manager = context.bot_data.get('profile_manager')
+    profile = profile_manager.get(user_id)
     if profile.is_complete():
+        if profile_manager.credentials_exist(profile.get_creds(), exclude_user_id=user_id):
+            await context.bot.send_message(
+                chat_id=user_id,
+                text=(
+                    "این اطلاعات قبلا برای یک عضو دیگه ثبت شده.\n"
+                    "اگه فکر می‌کنی اشتباهی پیش اومده به ادمین پیام بده: "
+                    f"<a href='https://t.me/{Config.ADMIN_USERNAME}'>@{Config.ADMIN_USERNAME}</a>"
+                ),
+                parse_mode="HTML"
+            )
+            return None
         for var in ['prof_edit_msg', 'c_field', ]:
             del context.user_data[var]
         profile.is_signed_up = True
-        profile.save()
+        await profile_manager.save(user_id)
         recognize_user(user_id, context.user_data, profile)
         await show_profile(update, context, active=False)
         return get_user_state(context.user_data['user_type'])
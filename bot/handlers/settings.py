@@ -37,28 +37,30 @@ async def show_settings(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def _reserve_notif_one(context: ContextTypes.DEFAULT_TYPE) -> None:
     user_ids = context.bot_data.get('profile_manager').user_ids_self_reserve()
-    for uid in user_ids:
-        await context.bot.send_message(
-            chat_id=uid,
-            text=(
-                "📢 چهارشنبه شما بخیر باشه؛ یادآوری می‌کنم غذای سلف هفته رو رزرو کنی\n\n "
-                '<a href="https://self.umz.ac.ir/">اینجا کلیک کن</a> *ـ^'
-            ),
-            parse_mode="HTML"
-        )
+    await context.bot_data['broadcaster'].broadcast(
+        "reserve_reminder",
+        user_ids,
+        window=RES.NOTIF_WINDOW_S,
+        text=(
+            "📢 چهارشنبه شما بخیر باشه؛ یادآوری می‌کنم غذای سلف هفته رو رزرو کنی\n\n "
+            '<a href="https://self.umz.ac.ir/">اینجا کلیک کن</a> *ـ^'
+        ),
+        parse_mode="HTML"
+    )
 
 
 async def _reserve_notif_two(context: ContextTypes.DEFAULT_TYPE) -> None:
     user_ids = context.bot_data.get('profile_manager').user_ids_self_reserve()
-    for uid in user_ids:
-        await context.bot.send_message(
-            chat_id=uid,
-            text=(
-                "📢 پنج شنبه شما بخیر باشه؛ برای رزرو غذا امروز اخرین مهلتت هست؛ یادت نره هااا\n\n "
-                '<a href="https://self.umz.ac.ir/">اینجا کلیک کن</a> *ـ^'
-            ),
-            parse_mode="HTML"
-        )
+    await context.bot_data['broadcaster'].broadcast(
+        "reserve_reminder",
+        user_ids,
+        window=RES.NOTIF_WINDOW_S,
+        text=(
+            "📢 پنج شنبه شما بخیر باشه؛ برای رزرو غذا امروز اخرین مهلتت هست؛ یادت نره هااا\n\n "
+            '<a href="https://self.umz.ac.ir/">اینجا کلیک کن</a> *ـ^'
+        ),
+        parse_mode="HTML"
+    )
 
 
 def weekly_job(app):
@@ -0,0 +1,375 @@
+from collections import Counter, defaultdict
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Mapping, Optional, Set, Tuple
+import numpy as np
+
+
+def _normalize(value: Any) -> Optional[str]:
+    """Comparison key of a credential; blank values (``''``, ``0``, ``None``) never match anything."""
+    if value is None or value == '' or value == 0:
+        return None
+    value = str(value).lower().strip()
+    return value or None
+
+
+class ProfileIndex:
+    """
+    Secondary structure that ProfileManager keeps in step with the profiles.
+
+    ``update`` receives the current record of a profile as a dict with every field present,
+    or None once it is deleted. The keys a profile was last indexed under are remembered, so an
+    update only touches what changed.
+    """
+
+    def __init__(self):
+        self._indexed: Dict[str, Hashable] = {}
+
+    def keys_for(self, record: Mapping[str, Any]) -> Hashable:
+        raise NotImplementedError
+
+    def _add(self, user_id: str, keys) -> None:
+        raise NotImplementedError
+
+    def _remove(self, user_id: str, keys) -> None:
+        raise NotImplementedError
+
+    def update(self, user_id: str, record: Optional[Mapping[str, Any]]) -> None:
+        new = self.keys_for(record) if record is not None else None
+        old = self._indexed.get(user_id)
+        if old == new:
+            return
+        if old is not None:
+            self._remove(user_id, old)
+            del self._indexed[user_id]
+        if new is not None:
+            self._add(user_id, new)
+            self._indexed[user_id] = new
+
+
+class CredentialIndex(ProfileIndex):
+    """
+    Hash indexes over the weighted credentials of ``uniqueness_weights``.
+
+    First and last name only identify someone together, so they share one index keyed by the
+    pair with their combined weight; every other weighted field gets an index of its own.
+    """
+
+    NAME_PAIR = ("first_name", "last_name")
+
+    def __init__(self, weights: Dict[str, float]):
+        super().__init__()
+        self.groups: Tuple[Tuple[Tuple[str, ...], float], ...] = self._group(weights)
+        self._maps: Tuple[Dict[Tuple[str, ...], Set[str]], ...] = tuple(defaultdict(set) for _ in self.groups)
+
+    @classmethod
+    def _group(cls, weights: Dict[str, float]):
+        groups = []
+        paired = all(name in weights for name in cls.NAME_PAIR)
+        if paired:
+            groups.append((cls.NAME_PAIR, sum(weights[name] for name in cls.NAME_PAIR)))
+        for attr, weight in weights.items():
+            if not (paired and attr in cls.NAME_PAIR):
+                groups.append(((attr,), weight))
+        return tuple(groups)
+
+    def _group_keys(self, get) -> Tuple[Optional[Tuple[str, ...]], ...]:
+        keys = []
+        for attrs, _ in self.groups:
+            key = tuple(_normalize(get(attr)) for attr in attrs)
+            keys.append(None if None in key else key)
+        return tuple(keys)
+
+    def keys_for(self, record: Mapping[str, Any]) -> Tuple[Optional[Tuple[str, ...]], ...]:
+        return self._group_keys(record.get)
+
+    def _add(self, user_id: str, keys) -> None:
+        for index, key in zip(self._maps, keys):
+            if key is not None:
+                index[key].add(user_id)
+
+    def _remove(self, user_id: str, keys) -> None:
+        for index, key in zip(self._maps, keys):
+            if key is not None:
+                holders = index[key]
+                holders.discard(user_id)
+                if not holders:
+                    del index[key]
+
+    def entries(self) -> Iterator[Tuple[int, Tuple[str, ...], str]]:
+        """Every (group number, key, user id) triple, for joining the index against other data."""
+        for group_no, index in enumerate(self._maps):
+            for key, holders in index.items():
+                for user_id in holders:
+                    yield group_no, key, user_id
+
+    def scores(self, creds: Dict[str, Any], exclude: Iterable[str] = ()) -> Dict[str, float]:
+        """Weighted match score of ``creds`` against every profile sharing at least one key."""
+        scores: Dict[str, float] = defaultdict(float)
+        for (_, weight), index, key in zip(self.groups, self._maps, self._group_keys(creds.get)):
+            if key is None:
+                continue
+            for user_id in index.get(key, ()):
+                scores[user_id] += weight
+        for user_id in exclude:
+            scores.pop(user_id, None)
+        return scores
+
+    def best_score(self, creds: Dict[str, Any], exclude: Iterable[str] = ()) -> float:
+        return max(self.scores(creds, exclude).values(), default=0.0)
+
+
+class SegmentIndex(ProfileIndex):
+    """Sets of user ids per audience segment, so audiences are set operations instead of scans."""
+
+    # segment -> the flag a member needs to belong to it; every member is in "all"
+    SEGMENTS = {
+        "all": None,
+        "signed_up": "is_signed_up",
+        "verified": "is_verified",
+        "self_reserve": "self_reserve",
+    }
+
+    def __init__(self):
+        super().__init__()
+        self.members: Dict[str, Set[str]] = {name: set() for name in self.SEGMENTS}
+        self._flags = tuple(flag for flag in self.SEGMENTS.values() if flag is not None)
+        # one shared key per combination of flags
+        self._keys: Dict[Tuple[bool, ...], frozenset] = {}
+
+    def keys_for(self, record: Mapping[str, Any]) -> frozenset:
+        flags = tuple([bool(record[flag]) for flag in self._flags])
+        keys = self._keys.get(flags)
+        if keys is None:
+            values = dict(zip(self._flags, flags))
+            keys = self._keys[flags] = frozenset(
+                name for name, flag in self.SEGMENTS.items() if flag is None or values[flag]
+            )
+        return keys
+
+    def _add(self, user_id: str, keys) -> None:
+        for name in keys:
+            self.members[name].add(user_id)
+
+    def _remove(self, user_id: str, keys) -> None:
+        for name in keys:
+            self.members[name].discard(user_id)
+
+    def audience(self, *segments: str) -> Set[str]:
+        """Members of every one of ``segments``."""
+        if not segments:
+            return set(self.members["all"])
+        first, *rest = segments
+        return self.members[first].intersection(*(self.members[name] for name in rest))
+
+
+class TagIndex(ProfileIndex):
+    """Inverted index from every skill and interest label to the user ids that selected it."""
+
+    FIELDS = ("skills", "interests")
+
+    def __init__(self, labels: Dict[str, Iterable[str]]):
+        super().__init__()
+        self.postings: Dict[str, Dict[str, Set[str]]] = {
+            field: {label: set() for label in labels.get(field, ())} for field in self.FIELDS
+        }
+
+    def keys_for(self, record: Mapping[str, Any]) -> Tuple[frozenset, ...]:
+        return tuple(frozenset(record[field]) for field in self.FIELDS)
+
+    def _add(self, user_id: str, keys) -> None:
+        for field, labels in zip(self.FIELDS, keys):
+            postings = self.postings[field]
+            for label in labels:
+                postings.setdefault(label, set()).add(user_id)
+
+    def _remove(self, user_id: str, keys) -> None:
+        for field, labels in zip(self.FIELDS, keys):
+            postings = self.postings[field]
+            for label in labels:
+                postings[label].discard(user_id)
+
+    def members(self, field: str, label: str) -> Set[str]:
+        return self.postings[field].get(label, set())
+
+    def matching(self, term: str) -> Set[str]:
+        """Members holding any skill or interest whose label contains ``term``."""
+        term = term.strip().lower()
+        found: Set[str] = set()
+        for postings in self.postings.values():
+            for label, holders in postings.items():
+                if term in label.lower():
+                    found |= holders
+        return found
+
+    def search(self, query: str) -> Set[str]:
+        """
+        Evaluates ``query`` made of terms joined by ``&`` (and) and ``|`` (or), with ``&`` binding
+        tighter; ``AND`` and ``OR`` are accepted as well. Labels themselves contain words
+        like "و", so only these symbols act as operators.
+        """
+        query = query.replace(" AND ", " & ").replace(" OR ", " | ")
+        result: Set[str] = set()
+        for alternative in query.split("|"):
+            terms = [term for term in alternative.split("&") if term.strip()]
+            if not terms:
+                continue
+            found = self.matching(terms[0])
+            for term in terms[1:]:
+                if not found:
+                    break
+                found = found & self.matching(term)
+            result |= found
+        return result
+
+
+class AttributeIndex(ProfileIndex):
+    """User ids per value of the categorical profile fields, for picking audiences by attribute."""
+
+    FIELDS = ("university", "degree", "study_field")
+
+    def __init__(self):
+        super().__init__()
+        self.postings: Dict[str, Dict[str, Set[str]]] = {field: {} for field in self.FIELDS}
+
+    def keys_for(self, record: Mapping[str, Any]) -> Tuple[Optional[str], ...]:
+        return tuple(record.get(field) or None for field in self.FIELDS)
+
+    def _add(self, user_id: str, keys) -> None:
+        for field, value in zip(self.FIELDS, keys):
+            if value is not None:
+                self.postings[field].setdefault(value, set()).add(user_id)
+
+    def _remove(self, user_id: str, keys) -> None:
+        for field, value in zip(self.FIELDS, keys):
+            if value is not None:
+                holders = self.postings[field][value]
+                holders.discard(user_id)
+                if not holders:
+                    del self.postings[field][value]
+
+    def members(self, field: str, value: str) -> Set[str]:
+        return self.postings[field].get(value, set())
+
+
+class StatsIndex(ProfileIndex):
+    """Member counts per university, degree, study field, skill, interest and status."""
+
+    FIELDS = ("university", "degree", "study_field")
+    LIST_FIELDS = ("skills", "interests")
+
+    def __init__(self):
+        super().__init__()
+        self.counts: Dict[str, Counter] = {
+            name: Counter() for name in ("status",) + self.FIELDS + self.LIST_FIELDS
+        }
+
+    @staticmethod
+    def status(record: Mapping[str, Any]) -> str:
+        if record["is_verified"]:
+            return "verified"
+        return "signed_up" if record["is_signed_up"] else "incomplete"
+
+    def keys_for(self, record: Mapping[str, Any]) -> frozenset:
+        keys = {("status", self.status(record))}
+        keys.update((field, record.get(field)) for field in self.FIELDS if record.get(field))
+        keys.update((field, value) for field in self.LIST_FIELDS for value in record[field])
+        return frozenset(keys)
+
+    def _add(self, user_id: str, keys) -> None:
+        for field, value in keys:
+            self.counts[field][value] += 1
+
+    def _remove(self, user_id: str, keys) -> None:
+        for field, value in keys:
+            counter = self.counts[field]
+            counter[value] -= 1
+            if counter[value] <= 0:
+                del counter[value]
+
+
+class TeammateIndex(ProfileIndex):
+    """
+    Verified members encoded as fixed-width rows over the skill and interest labels, so a
+    teammate recommendation is one matrix-vector product followed by a top-k selection.
+
+    A candidate scores for every interest shared with the requester, for every skill the
+    requester lacks (complement) and, less, for every skill both have.
+    """
+
+    SHARED_INTEREST = 2.0
+    COMPLEMENT_SKILL = 1.0
+    SHARED_SKILL = 0.5
+
+    def __init__(self, labels: Dict[str, Iterable[str]], capacity: int = 1024):
+        super().__init__()
+        self.skills: List[str] = list(labels.get("skills", ()))
+        self.interests: List[str] = list(labels.get("interests", ()))
+        self._column = {("skills", label): i for i, label in enumerate(self.skills)}
+        self._column.update({("interests", label): len(self.skills) + i for i, label in enumerate(self.interests)})
+        self._matrix = np.zeros((capacity, len(self._column)), dtype=np.float32)
+        self._active = np.zeros(capacity, dtype=bool)
+        self._row_of: Dict[str, int] = {}
+        self._user_at: List[Optional[str]] = [None] * capacity
+        self._free: List[int] = list(range(capacity - 1, -1, -1))
+
+    def keys_for(self, record: Mapping[str, Any]) -> Optional[frozenset]:
+        if not record["is_verified"]:
+            return None
+        return frozenset(
+            self._column[(field, label)]
+            for field in ("skills", "interests")
+            for label in record[field]
+            if (field, label) in self._column
+        )
+
+    def _grow(self) -> None:
+        old = len(self._active)
+        self._matrix = np.vstack([self._matrix, np.zeros_like(self._matrix)])
+        self._active = np.concatenate([self._active, np.zeros(old, dtype=bool)])
+        self._user_at.extend([None] * old)
+        self._free.extend(range(2 * old - 1, old - 1, -1))
+
+    def _add(self, user_id: str, keys) -> None:
+        if not self._free:
+            self._grow()
+        row = self._free.pop()
+        self._matrix[row] = 0
+        self._matrix[row, list(keys)] = 1
+        self._active[row] = True
+        self._row_of[user_id] = row
+        self._user_at[row] = user_id
+
+    def _remove(self, user_id: str, keys) -> None:
+        row = self._row_of.pop(user_id)
+        self._active[row] = False
+        self._user_at[row] = None
+        self._free.append(row)
+
+    def vector(self, profile) -> np.ndarray:
+        vec = np.zeros(len(self._column), dtype=np.float32)
+        for field in ("skills", "interests"):
+            for label in getattr(profile, field):
+                column = self._column.get((field, label))
+                if column is not None:
+                    vec[column] = 1
+        return vec
+
+    def recommend(self, profile, k: int = 5) -> List[Tuple[str, float]]:
+        """Best ``k`` verified members for ``profile`` with a positive score, best first."""
+        vec = self.vector(profile)
+        n_skills = len(self.skills)
+        weights = np.empty_like(vec)
+        weights[:n_skills] = np.where(vec[:n_skills] > 0, self.SHARED_SKILL, self.COMPLEMENT_SKILL)
+        weights[n_skills:] = vec[n_skills:] * self.SHARED_INTEREST
+
+        scores = self._matrix @ weights
+        scores[~self._active] = -np.inf
+        own_row = self._row_of.get(str(profile.user_id))
+        if own_row is not None:
+            scores[own_row] = -np.inf
+
+        k = min(k, int(np.count_nonzero(scores > 0)))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self._user_at[row], float(scores[row])) for row in top]
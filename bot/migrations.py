@@ -0,0 +1,165 @@
+import inspect
+import json
+import logging
+import os
+import re
+import sys
+from typing import Any, Collection, Dict, List, NamedTuple, Optional
+
+
+log = logging.getLogger(__name__)
+
+SCHEMA_VERSION = "schema_version"
+BATCH_SIZE = 1000
+_FILENAME = re.compile(r"^(\d+)_?(.*)\.json$")
+
+
+def add_key(record: Dict[str, Any], key: str, value: Any) -> bool:
+    record[key] = value
+    return True
+
+
+def edit_key(record: Dict[str, Any], key: str, value: Any) -> bool:
+    if key not in record:
+        return False
+    record[key] = value
+    return True
+
+
+def rename_key(record: Dict[str, Any], old_key: str, new_key: str) -> bool:
+    if old_key not in record:
+        return False
+    record[new_key] = record.pop(old_key)
+    return True
+
+
+def delete_key(record: Dict[str, Any], key: str) -> bool:
+    if key not in record:
+        return False
+    del record[key]
+    return True
+
+
+OPERATIONS = {
+    "add-key": add_key,
+    "edit-key": edit_key,
+    "rename-key": rename_key,
+    "delete-key": delete_key
+}
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    operations: List[Dict[str, Any]]
+
+
+def validate(operations: List[Dict[str, Any]], known_keys: Optional[Collection[str]] = None) -> None:
+    """
+    Fails before any record is touched if an operation is unknown or misses arguments, or,
+    given ``known_keys``, would create a key outside them.
+    """
+    for n, operation in enumerate(operations, start=1):
+        args = dict(operation)
+        op = args.pop("op", None)
+        if op not in OPERATIONS:
+            raise ValueError(f"operation {n}: unknown op {op!r}")
+        try:
+            inspect.signature(OPERATIONS[op]).bind({}, **args)
+        except TypeError as e:
+            raise ValueError(f"operation {n} ({op}): {e}") from None
+        created = args.get("key") if op == "add-key" else args.get("new_key")
+        if known_keys is not None and created is not None and created not in known_keys:
+            raise ValueError(f"operation {n} ({op}): {created!r} is not a profile field")
+
+
+def repeatable(operations: List[Dict[str, Any]]) -> bool:
+    """
+    Whether applying ``operations`` twice gives the same records as applying them once. Each
+    operation does on its own; a sequence does not once a renamed key is created again later,
+    since a second run would rename that new value as well.
+    """
+    renamed = set()
+    for operation in operations:
+        created = operation.get("key") if operation["op"] == "add-key" else operation.get("new_key")
+        if created in renamed:
+            return False
+        if operation["op"] == "rename-key":
+            renamed.add(operation["old_key"])
+    return True
+
+
+def load_migrations(directory: str) -> List[Migration]:
+    """
+    Migrations in ``directory``, oldest first. Each is a JSON list of operations such as
+    ``{"op": "add-key", "key": "self_reserve", "value": true}`` in a file named after its
+    version, e.g. ``0002_self_reserve.json``. A key has to exist on ``Profile`` before a
+    migration may create it.
+    """
+    if not os.path.isdir(directory):
+        return []
+    migrations = []
+    for filename in os.listdir(directory):
+        match = _FILENAME.match(filename)
+        if not match:
+            continue
+        with open(os.path.join(directory, filename), 'r', encoding='utf-8') as f:
+            operations = json.load(f)
+        validate(operations)
+        migrations.append(Migration(int(match.group(1)), match.group(2) or filename, operations))
+    migrations.sort(key=lambda m: m.version)
+    for previous, current in zip(migrations, migrations[1:]):
+        if previous.version == current.version:
+            raise ValueError(f"two migrations with version {current.version} in {directory}")
+    return migrations
+
+
+def apply_operations(store, operations: List[Dict[str, Any]], batch_size: int = BATCH_SIZE) -> List[int]:
+    """
+    Applies ``operations`` in order to every record in one pass over the store, writing the
+    changed records back every ``batch_size`` records, so the store can compact in between.
+    Returns how many records each operation changed.
+    """
+    validate(operations)
+    steps = [(OPERATIONS[op["op"]], {k: v for k, v in op.items() if k != "op"}) for op in operations]
+    counts = [0] * len(steps)
+    changed = {}
+    for key, record in store.items():
+        touched = False
+        for n, (operation, args) in enumerate(steps):
+            if operation(record, **args):
+                counts[n] += 1
+                touched = True
+        if touched:
+            changed[key] = record
+            if len(changed) >= batch_size:
+                store.write_many(changed)
+                changed = {}
+    if changed:
+        store.write_many(changed)
+    return counts
+
+
+def migrate(store, directory: str, known_keys: Optional[Collection[str]] = None) -> int:
+    """
+    Brings ``store`` up to the newest migration in ``directory`` and returns its schema version.
+
+    All pending migrations are folded into a single pass. The version is recorded after the
+    last batch is written, so an interrupted run is repeated from the start next time, over
+    records that may already be migrated; operations that are not ``repeatable`` are
+    therefore written in one batch. With ``known_keys``, migrations creating any other key
+    are refused before anything is written.
+    """
+    current = store.get_meta(SCHEMA_VERSION, 0)
+    pending = [m for m in load_migrations(directory) if m.version > current]
+    if not pending:
+        return current
+    operations = [operation for migration in pending for operation in migration.operations]
+    validate(operations, known_keys)
+    batch_size = BATCH_SIZE if repeatable(operations) else sys.maxsize
+    counts = apply_operations(store, operations, batch_size)
+    version = pending[-1].version
+    store.set_meta(SCHEMA_VERSION, version)
+    log.info(f"migrated profiles from schema {current} to {version} "
+             f"({', '.join(m.name for m in pending)}; {sum(counts)} changes)")
+    return version
@@ -0,0 +1,228 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Tuple
+from telegram.error import TimedOut
+from telegram.ext import BaseRateLimiter
+from telegram.request import BaseRequest, HTTPXRequest, RequestData
+from .construct import RES
+
+
+log = logging.getLogger(__name__)
+
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+PRIORITIES = {INTERACTIVE: 0, BULK: 1}
+
+# passed as ``rate_limit_args`` by background senders such as broadcasts
+BULK_REQUEST = {"priority": BULK}
+
+
+class _ClassStats:
+    __slots__ = ("waiting", "in_flight", "served", "total_wait", "max_wait")
+
+    def __init__(self):
+        self.waiting = 0
+        self.in_flight = 0
+        self.served = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "waiting": self.waiting,
+            "in_flight": self.in_flight,
+            "served": self.served,
+            "avg_wait_ms": 1000 * self.total_wait / self.served if self.served else 0.0,
+            "max_wait_ms": 1000 * self.max_wait
+        }
+
+
+class PriorityRateLimiter(BaseRateLimiter[Dict[str, Any]]):
+    """
+    Every Bot API call except ``getUpdates`` passes through here. At most ``max_in_flight``
+    calls run at once and a freed slot always goes to the most urgent waiting call, so
+    interactive replies overtake queued broadcast sends. Bulk calls, marked with
+    ``rate_limit_args=BULK_REQUEST``, never take the last ``reserved`` slots, which keeps
+    room for a reply even while a broadcast fills the rest.
+    """
+
+    def __init__(self, max_in_flight: int = RES.OUTBOUND_MAX_IN_FLIGHT, reserved: int = RES.OUTBOUND_RESERVED):
+        self.max_in_flight = max_in_flight
+        self.reserved = reserved
+        self._in_flight = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._order = itertools.count()
+        self.stats: Dict[str, _ClassStats] = {name: _ClassStats() for name in PRIORITIES}
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    def _limit(self, priority: int) -> int:
+        return self.max_in_flight if priority == PRIORITIES[INTERACTIVE] else self.max_in_flight - self.reserved
+
+    def _dispatch(self) -> None:
+        while self._waiters:
+            priority, _, future = self._waiters[0]
+            if future.done():
+                # cancelled while waiting
+                heapq.heappop(self._waiters)
+                continue
+            if self._in_flight >= self._limit(priority):
+                return
+            heapq.heappop(self._waiters)
+            self._in_flight += 1
+            future.set_result(None)
+
+    async def _acquire(self, priority: int) -> None:
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._order), future))
+        # grants right away if a slot is free for this call and nothing more urgent is waiting
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # granted just as the caller went away; hand the slot on
+                self._release()
+            raise
+
+    def _release(self) -> None:
+        self._in_flight -= 1
+        self._dispatch()
+
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Any]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Optional[Dict[str, Any]],
+    ):
+        name = (rate_limit_args or {}).get("priority", INTERACTIVE)
+        stats = self.stats[name]
+        stats.waiting += 1
+        queued = time.monotonic()
+        try:
+            await self._acquire(PRIORITIES[name])
+        finally:
+            stats.waiting -= 1
+        wait = time.monotonic() - queued
+        stats.served += 1
+        stats.total_wait += wait
+        stats.max_wait = max(stats.max_wait, wait)
+        stats.in_flight += 1
+        try:
+            return await callback(*args, **kwargs)
+        finally:
+            stats.in_flight -= 1
+            self._release()
+
+    def queue_info(self) -> Dict[str, Dict[str, float]]:
+        return {name: stats.as_dict() for name, stats in self.stats.items()}
+
+
+class _PoolStats:
+    __slots__ = ("requests", "waited", "timeouts", "total_wait", "max_wait", "peak", "since")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.requests = 0
+        self.waited = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.peak = 0
+        self.since = time.monotonic()
+
+
+class PooledRequest(HTTPXRequest):
+    """
+    ``HTTPXRequest`` that admits at most ``connection_pool_size`` requests at a time, so a
+    request waiting for a connection waits here where it can be timed. Every
+    ``RES.POOL_REPORT_S`` a pool that had to make requests wait logs how often and for how
+    long; running out of ``pool_timeout`` is logged as a warning.
+    """
+
+    def __init__(self, name: str, connection_pool_size: int, **kwargs):
+        super().__init__(connection_pool_size=connection_pool_size, **kwargs)
+        self.name = name
+        self.size = connection_pool_size
+        self._slots = asyncio.Semaphore(connection_pool_size)
+        self._in_use = 0
+        self.stats = _PoolStats()
+
+    async def _wait_for_connection(self, pool_timeout: Optional[float]) -> None:
+        stats = self.stats
+        if not self._slots.locked():
+            await self._slots.acquire()
+            return
+        queued = time.monotonic()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), pool_timeout)
+        except asyncio.TimeoutError:
+            stats.timeouts += 1
+            log.warning(f"{self.name} pool: all {self.size} connections busy for {pool_timeout}s, request dropped")
+            raise TimedOut(f"Pool timeout: all {self.size} connections of the {self.name} pool are occupied")
+        wait = time.monotonic() - queued
+        stats.waited += 1
+        stats.total_wait += wait
+        stats.max_wait = max(stats.max_wait, wait)
+
+    def _report(self) -> None:
+        stats = self.stats
+        elapsed = time.monotonic() - stats.since
+        if elapsed < RES.POOL_REPORT_S:
+            return
+        if stats.waited or stats.timeouts:
+            log.info(
+                f"{self.name} pool saturated: {stats.waited}/{stats.requests} requests waited for a connection "
+                f"in the last {elapsed:.0f}s, avg {1000 * stats.total_wait / max(stats.waited, 1):.0f}ms, "
+                f"max {1000 * stats.max_wait:.0f}ms, {stats.timeouts} timed out, peak {stats.peak}/{self.size} in use"
+            )
+        stats.reset()
+
+    async def do_request(
+        self,
+        url: str,
+        method: str,
+        request_data: Optional[RequestData] = None,
+        read_timeout=BaseRequest.DEFAULT_NONE,
+        write_timeout=BaseRequest.DEFAULT_NONE,
+        connect_timeout=BaseRequest.DEFAULT_NONE,
+        pool_timeout=BaseRequest.DEFAULT_NONE,
+    ) -> Tuple[int, bytes]:
+        if pool_timeout is BaseRequest.DEFAULT_NONE:
+            pool_timeout = self._client.timeout.pool
+        await self._wait_for_connection(pool_timeout)
+        self._in_use += 1
+        self.stats.requests += 1
+        self.stats.peak = max(self.stats.peak, self._in_use)
+        try:
+            return await super().do_request(url, method, request_data, read_timeout, write_timeout,
+                                            connect_timeout, pool_timeout)
+        finally:
+            self._in_use -= 1
+            self._slots.release()
+            self._report()
+
+    def pool_info(self) -> Dict[str, float]:
+        """Current use, and the peak, waits and timeouts since the last report."""
+        stats = self.stats
+        return {
+            "size": self.size,
+            "in_use": self._in_use,
+            "peak": stats.peak,
+            "waited": stats.waited,
+            "max_wait_ms": 1000 * stats.max_wait,
+            "timeouts": stats.timeouts
+        }
@@ -1,12 +1,32 @@
-import pandas as pd
-from .utility import async_json_key_update, async_json_key_delete
+import asyncio
+import gc
+import logging
+import sys
+from collections import OrderedDict
 from .construct import RES
-from dataclasses import dataclass, asdict, field
-from typing import List, Dict, Any, Optional
+from .storage import ProfileStore
+from .snapshots import restore_latest
+from .migrations import SCHEMA_VERSION, migrate
+from .indexes import AttributeIndex, CredentialIndex, SegmentIndex, StatsIndex, TagIndex, TeammateIndex
+from dataclasses import MISSING, dataclass, asdict, field, fields
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Set, Tuple
 import copy
 
 
-@dataclass
+# categorical values shared by many members; interned so every profile points at one string
+_INTERNED_FIELDS = frozenset({"university", "degree", "study_field"})
+_INTERNED_LIST_FIELDS = frozenset({"skills", "interests"})
+
+
+def _interned(name: str, value: Any) -> Any:
+    if name in _INTERNED_FIELDS and isinstance(value, str):
+        return sys.intern(value)
+    if name in _INTERNED_LIST_FIELDS and isinstance(value, list):
+        return [sys.intern(v) if isinstance(v, str) else v for v in value]
+    return value
+
+
+@dataclass(slots=True)
 class Profile:
     first_name: str
     last_name: str
@@ -24,6 +44,9 @@ class Profile:
     scale: int = 38
     self_reserve: bool = True
 
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, _interned(name, value))
+
     def __str__(self) -> str:
         sections = [
             ("نام", self.full_name()),
@@ -48,7 +71,7 @@ class Profile:
         return f"{header_line}\n{top_border}\n{body}\n{bottom_border}"
 
     def is_complete(self) -> bool:
-        for field_name, empty_value in required_fields_check.items():
+        for field_name, empty_value in RES.REQUIRED_FIELDS.items():
             current_value = getattr(self, field_name)
             if current_value == empty_value:
                 return False
@@ -56,7 +79,7 @@ class Profile:
 
 
     def get_creds(self):
-        return {k: self.__dict__[k] for k in RES.CREDS_FA if k in self.__dict__}
+        return {k: getattr(self, k) for k in RES.CREDS_FA if hasattr(self, k)}
 
     def adjust_scale(self, p):
         min_scale = 5
@@ -74,33 +97,165 @@ class Profile:
         return skill in self.skills
 
 
+# what Profile fills in for fields a stored record may lack
+_RECORD_DEFAULTS = {
+    f.name: f.default if f.default is not MISSING else f.default_factory()
+    for f in fields(Profile) if f.default is not MISSING or f.default_factory is not MISSING
+}
+
+
+def _index_record(data: Dict[str, Any]) -> Dict[str, Any]:
+    """A stored record as the indexes read it: defaults filled in, categorical values interned."""
+    record = _RECORD_DEFAULTS | data
+    for name in _INTERNED_FIELDS | _INTERNED_LIST_FIELDS:
+        if name in record:
+            record[name] = _interned(name, record[name])
+    return record
+
+
+log = logging.getLogger(__name__)
+
+
 class ProfileManager:
 
-    def __init__(self, profiles_dict: Dict[str, Dict[str, Any]]):
-        self.profiles_dict = profiles_dict
-        self._path = RES.DATABASE_PATH
-        self.profiles: Dict[str, Profile] = {
-            uid: Profile(**data) for uid, data in profiles_dict.items()
+    def __init__(self,
+                 store: ProfileStore,
+                 flush_interval_ms: int = RES.FLUSH_INTERVAL_MS,
+                 cache_size: int = RES.PROFILE_CACHE_SIZE,
+                 migrations_dir: Optional[str] = None):
+        self._store = store
+        self._flush_interval = flush_interval_ms / 1000
+        self._dirty: set[str] = set()
+        self._flushing: set[str] = set()
+        self._wake = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._flusher: Optional[asyncio.Task] = None
+        # user id -> Profile, or None for a deletion that is not persisted yet
+        self._cache: OrderedDict[str, Optional[Profile]] = OrderedDict()
+        self._cache_size = cache_size
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # bumped on every change, so derived artifacts such as exports know when they are stale
+        self.generation = 0
+        self._credentials = CredentialIndex(RES.WEIGHTS)
+        self.segments = SegmentIndex()
+        self.tags = TagIndex(RES.LABELS)
+        self.teammates = TeammateIndex(RES.LABELS)
+        self.stats = StatsIndex()
+        self.attributes = AttributeIndex()
+        self._indexes = [self._credentials, self.segments, self.tags, self.teammates, self.stats, self.attributes]
+        # startup allocates a few objects per member; collections running over the growing
+        # heap again and again would cost more than reading and indexing the store itself.
+        # The collector is only paused for the bulk load and is back on before this returns.
+        was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            self._load()
+            # after _load, so records restored from a snapshot are migrated as well
+            if migrations_dir:
+                migrate(self._store, migrations_dir, {f.name for f in fields(Profile)})
+            self._rebuild_indexes()
+        finally:
+            if was_enabled:
+                gc.enable()
+        # the loaded indexes live as long as the bot; keep later collections from rescanning them
+        gc.freeze()
+
+    def _load(self) -> None:
+        try:
+            empty = not any(True for _ in self._store.keys())
+        except (OSError, ValueError) as e:
+            log.error(f"Failed to load profiles from the store: {e}")
+            empty = True
+        if empty:
+            restored = restore_latest(RES.SNAPSHOT_DIR)
+            if restored:
+                records, schema_version = restored
+                self._store.recover(records)
+                # the restored records are as old as the snapshot, whatever the store had reached
+                self._store.set_meta(SCHEMA_VERSION, schema_version)
+
+    @property
+    def schema_version(self) -> int:
+        return self._store.get_meta(SCHEMA_VERSION, 0)
+
+    def _rebuild_indexes(self) -> None:
+        # one pass over the stored dicts; hydrating a Profile per member costs more than indexing it
+        for user_id, data in self._store.items():
+            self._reindex_record(user_id, data)
+
+    def _reindex_record(self, user_id: str, data: Optional[Dict[str, Any]]) -> None:
+        record = _index_record(data) if data is not None else None
+        for index in self._indexes:
+            index.update(user_id, record)
+
+    def _reindex(self, user_id: str, profile: Optional[Profile]) -> None:
+        self._reindex_record(user_id, asdict(profile) if profile is not None else None)
+
+    def _pinned(self, user_id: str) -> bool:
+        return user_id in self._dirty or user_id in self._flushing
+
+    def _cache_put(self, user_id: str, profile: Optional[Profile]) -> None:
+        self._cache[user_id] = profile
+        self._cache.move_to_end(user_id)
+        self._evict()
+
+    def _evict(self) -> None:
+        excess = len(self._cache) - self._cache_size
+        if excess <= 0:
+            return
+        # dirty entries are the only copy of their changes, so they stay until persisted
+        for user_id in [uid for uid in self._cache if not self._pinned(uid)][:excess]:
+            del self._cache[user_id]
+
+    def _mark_dirty(self, user_id: str) -> None:
+        self.generation += 1
+        self._dirty.add(user_id)
+        self._wake.set()
+
+    def cache_info(self) -> Dict[str, int]:
+        return {
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "size": len(self._cache),
+            "max_size": self._cache_size,
+            "pinned": len(self._dirty | self._flushing)
         }
 
     def get(self, user_id: str | int) -> Optional[Profile]:
-        if isinstance(user_id, int):
-            user_id = str(user_id)
-        return self.profiles.get(user_id)
-
-    def credentials_exist(self, creds: Dict[str, Any]) -> bool:
-        def match_score(profile: Profile) -> float:
-            score = 0.0
-            for attr, weight in self.WEIGHTS.items():
-                a = str(creds[attr]).lower().strip()
-                b = str(getattr(profile, attr)).lower().strip()
-                if a == b:
-                    score += weight
-                    if score >= 1.0:
-                        break
-            return score
-
-        return any(match_score(p) >= 1.0 for p in self.profiles.values())
+        user_id = str(user_id)
+        if user_id in self._cache:
+            self.cache_hits += 1
+            self._cache.move_to_end(user_id)
+            return self._cache[user_id]
+
+        self.cache_misses += 1
+        data = self._store.get(user_id)
+        if data is None:
+            return None
+        profile = Profile(**data)
+        self._cache_put(user_id, profile)
+        return profile
+
+    def user_ids(self) -> List[str]:
+        return list(self.segments.members["all"])
+
+    def iter_records(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Yields every profile as a plain dict, taking unpersisted changes from the cache.
+        Profiles that are not cached are read straight from the store without hydrating them.
+        """
+        cached = dict(self._cache)
+        for user_id, profile in cached.items():
+            if profile is not None:
+                yield user_id, asdict(profile)
+        for user_id, data in self._store.items():
+            if user_id not in cached:
+                yield user_id, data
+
+    def credentials_exist(self, creds: Dict[str, Any], exclude_user_id: str | int | None = None) -> bool:
+        exclude = () if exclude_user_id is None else (str(exclude_user_id),)
+        return self._credentials.best_score(creds, exclude) >= 1.0
 
     @staticmethod
     def _normalize_list_field(value: Any, field_name: str) -> List[str]:
@@ -121,7 +276,7 @@ class ProfileManager:
         creds["interests"] = self._normalize_list_field(creds.get("interests"), "interests")
 
         # generic type validation
-        for field_name, expected in self.REQUIRED_FIELDS.items():
+        for field_name, expected in RES.REQUIRED_FIELDS.items():
             expected = type(expected)
             val = creds.get(field_name)
             if not isinstance(val, expected):
@@ -138,56 +293,149 @@ class ProfileManager:
                     raise ValueError("Do not provide credentials when using new=True.")
                 empty_creds = RES.REQUIRED_FIELDS.copy()
                 empty_creds["user_id"] = user_id
-                self.profiles[str(user_id)] = Profile(**empty_creds)
-                return self.profiles[str(user_id)]
+                profile = Profile(**empty_creds)
 
-            if creds is None:
+            elif creds is None:
                 raise ValueError("Credentials required unless new=True.")
 
-            if isinstance(creds, dict):
+            elif isinstance(creds, dict):
                 self.check_credentials(creds)
-                self.profiles[str(user_id)] = Profile(user_id=user_id, **creds)
+                profile = Profile(user_id=user_id, **creds)
 
-            elif isinstance(creds, Profile):
-                self.check_credentials(creds.__dict__)
-                self.profiles[str(user_id)] = creds
+            else:
+                data = asdict(creds)
+                self.check_credentials(data)
+                profile = Profile(**data)
 
-            return self.profiles[str(user_id)]
+            # pinned as dirty right away so the cache cannot evict a profile that exists nowhere else
+            self._mark_dirty(str(user_id))
+            self._cache_put(str(user_id), profile)
+            self._reindex(str(user_id), profile)
+            return profile
 
         except Exception as e:
             print(f"Failed to add profile for user {user_id}: {e}")
             return False
 
+    def credential_entries(self) -> List[Tuple[int, Tuple[str, ...], str]]:
+        return list(self._credentials.entries())
+
+    @property
+    def credential_groups(self):
+        return self._credentials.groups
+
+    async def import_profiles(self, records: Dict[str, Dict[str, Any]]) -> None:
+        """Adds already validated profiles with a single batched store write."""
+        async with self._flush_lock:
+            await self._store.put_many(records)
+        for user_id, data in records.items():
+            self._reindex_record(user_id, data)
+        self.generation += 1
+
     def delete_profile(self, user_id: int) -> bool:
-        return bool(self.profiles.pop(str(user_id), None))
+        existed = self.get(user_id) is not None
+        if existed:
+            self._mark_dirty(str(user_id))
+            self._cache_put(str(user_id), None)
+            self._reindex(str(user_id), None)
+        return existed
+
+    def snapshot_source(self) -> Tuple[Dict[str, Optional[Dict[str, Any]]],
+                                       Callable[[], Iterable[Tuple[str, bytes]]]]:
+        """
+        What a snapshot needs, taken without decoding any stored record: the cached profiles,
+        which hold every unpersisted change, and a view of the store's encoded records.
+        """
+        cached = {uid: asdict(profile) if profile is not None else None for uid, profile in self._cache.items()}
+        return cached, self._store.encoded_view()
 
     async def save(self, user_id: str | int) -> None:
-        if isinstance(user_id, int):
-            user_id = str(user_id)
-
-        profile = self.get(user_id)
-        if profile:
-            data = asdict(profile)
-            await async_json_key_update(RES.DATABASE_PATH, user_id, data)
-        else:
-            await async_json_key_delete(RES.DATABASE_PATH, user_id)
-
-    def export(self):
-        data = self.profiles_dict
-        flat_data = []
-        for _, user_info in data.items():
-            record = user_info.copy()
-            # Convert lists to comma-separated strings
-            record["skills"] = ", ".join(record.get("skills", []))
-            record["interests"] = ", ".join(record.get("interests", []))
-            flat_data.append(record)
-
-        df = pd.DataFrame(flat_data)
-        df = df.reindex(columns=RES.CREDS_FA.keys())
-        df.to_excel(RES.EXPORT_PATH, index=False, engine='openpyxl')
+        """Marks the profile dirty; the flusher task persists it with the next batch."""
+        user_id = str(user_id)
+        self._mark_dirty(user_id)
+        if user_id in self._cache:
+            # handlers edit the cached Profile in place, so this is where edits reach the indexes
+            self._reindex(user_id, self._cache[user_id])
+
+    def start_flusher(self) -> None:
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await self._wake.wait()
+            # let saves arriving within the interval coalesce into the same write
+            await asyncio.sleep(self._flush_interval)
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                log.error(f"Failed to flush profiles, retrying with the next batch: {e}")
+                self._wake.set()
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            if not self._dirty:
+                return
+            batch_ids, self._dirty = self._dirty, set()
+            # stays pinned while the write is in flight, or a reload could read the old record
+            self._flushing = batch_ids
+            batch = {}
+            for user_id in batch_ids:
+                if user_id in self._cache:
+                    profile = self._cache[user_id]
+                    batch[user_id] = asdict(profile) if profile else None
+            try:
+                await self._store.put_many(batch)
+            except BaseException:
+                # also covers cancellation at shutdown; close() writes the batch again
+                self._dirty |= batch_ids
+                raise
+            finally:
+                self._flushing = set()
+            for user_id, data in batch.items():
+                if data is None and user_id not in self._dirty:
+                    self._cache.pop(user_id, None)
+            self._evict()
+
+    async def close(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+        await self._store.close()
+        log.info(f"profile cache: {self.cache_info()}")
 
     def user_ids_self_reserve(self):
-        return [
-            user_id for user_id, data in self.profiles_dict.items()
-            if data.get("is_verified") and data.get("self_reserve") is True
-        ]
+        return list(self.segments.audience("verified", "self_reserve"))
+
+    def status_members(self, status: str) -> Set[str]:
+        """Members with the given ``StatsIndex.status``."""
+        members = self.segments.members
+        if status == "verified":
+            return set(members["verified"])
+        if status == "signed_up":
+            return members["signed_up"] - members["verified"]
+        return members["all"] - members["signed_up"]
+
+    def audience(self, criteria: Dict[str, Iterable[str]]) -> Set[str]:
+        """
+        Members matching every field in ``criteria`` and, within a field, any of its values.
+        Fields are those of the attribute and tag indexes plus ``status``; no criteria means everyone.
+        """
+        result = None
+        for field_name, values in criteria.items():
+            found: Set[str] = set()
+            for value in values:
+                if field_name == "status":
+                    found |= self.status_members(value)
+                elif field_name in AttributeIndex.FIELDS:
+                    found |= self.attributes.members(field_name, value)
+                else:
+                    found |= self.tags.members(field_name, value)
+            result = found if result is None else result & found
+        return set(self.segments.members["all"]) if result is None else result
@@ -9,6 +9,7 @@ from telegram.ext import (
     CallbackQueryHandler,
     ConversationHandler,
     MessageHandler,
+    TypeHandler,
     filters
 )
 from bot.construct import (
@@ -24,6 +25,12 @@ async def restart_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return ConversationHandler.END
 
 
+async def note_reachable(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Anyone writing to the bot can be reached again, even if they blocked it before."""
+    if update.effective_user is not None:
+        context.bot_data['broadcaster'].delivery.seen(update.effective_user.id)
+
+
 def register(app: _application.Application) -> None:
     labels = RES.LABELS
     main_filter = filters.TEXT & ~filters.COMMAND & ~filters.Regex(f"^{re.escape(labels['2'])}$")
@@ -98,9 +105,60 @@ def register(app: _application.Application) -> None:
                             States.STUDENT: States.STUDENT,
                             States.UNREGISTERED: States.UNREGISTERED
                         })
+    member_search_conv = ConversationHandler(
+        entry_points=[MessageHandler(filters.Regex(f"^{labels['33']}$"), on_member_search)],
+        states={
+            States.MEMBER_SEARCH: [
+                MessageHandler(main_filter, search_members),
+                CallbackQueryHandler(on_search_page, pattern="^member_search:")
+            ]
+        },
+        fallbacks=[MessageHandler(filters.Regex(labels['2']), go_back_members),
+                   restart_handler],
+        map_to_parent={
+            States.ADMIN: States.ADMIN,
+            States.STUDENT: States.STUDENT,
+            States.UNREGISTERED: States.UNREGISTERED
+        }
+    )
+    bulk_import_conv = ConversationHandler(
+        entry_points=[MessageHandler(filters.Regex(f"^{labels['38']}$"), on_bulk_import)],
+        states={
+            States.BULK_IMPORT: [
+                MessageHandler(filters.Document.ALL, bulk_import_file)
+            ]
+        },
+        fallbacks=[MessageHandler(filters.Regex(labels['2']), go_back_members),
+                   restart_handler],
+        map_to_parent={
+            States.ADMIN: States.ADMIN,
+            States.STUDENT: States.STUDENT,
+            States.UNREGISTERED: States.UNREGISTERED
+        }
+    )
+    announce_conv = ConversationHandler(
+        entry_points=[MessageHandler(filters.Regex(f"^{labels['39']}$"), on_announce)],
+        states={
+            States.ANNOUNCE_COMPOSE: [
+                MessageHandler(main_filter, announce_text)
+            ],
+            States.ANNOUNCE_AUDIENCE: [
+                CallbackQueryHandler(send_announcement, pattern="^announce:send$"),
+                CallbackQueryHandler(on_announce_option, pattern="^announce:")
+            ]
+        },
+        fallbacks=[MessageHandler(filters.Regex(labels['2']), go_back_announce),
+                   restart_handler],
+        map_to_parent={
+            States.ADMIN: States.ADMIN,
+            States.STUDENT: States.STUDENT,
+            States.UNREGISTERED: States.UNREGISTERED
+        }
+    )
     common_hs = [
         MessageHandler(filters.Regex(f"^{labels['12']}$"), show_profile),
         MessageHandler(filters.Regex(f"^{labels['30']}$"), about),
+        MessageHandler(filters.Regex(f"^{labels['36']}$"), find_teammates),
         content_creation_conv,
         settings_conv,
         signup_or_profile_edit_conv
@@ -110,7 +168,12 @@ def register(app: _application.Application) -> None:
         states={
             States.START: [CommandHandler('start', start)],
             States.ADMIN: common_hs + [
-                MessageHandler(filters.Regex(f"^{labels['24']}$"), export_profiles)
+                MessageHandler(filters.Regex(f"^{labels['24']}$"), export_profiles),
+                CommandHandler('export', export_profiles_as),
+                MessageHandler(filters.Regex(f"^{labels['37']}$"), show_stats),
+                member_search_conv,
+                bulk_import_conv,
+                announce_conv
             ],
             States.STUDENT: common_hs + [],
             States.UNREGISTERED: [signup_or_profile_edit_conv],
@@ -120,6 +183,7 @@ def register(app: _application.Application) -> None:
             CommandHandler('start', start)
         ]
     )
+    app.add_handler(TypeHandler(Update, note_reachable), group=-1)
     app.add_handler(main_conv)
     weekly_job(app)
 
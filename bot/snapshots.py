@@ -0,0 +1,119 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from telegram.ext import ContextTypes
+from .construct import RES
+from .utility import json_dumps, json_loads
+
+
+log = logging.getLogger(__name__)
+
+_PREFIX = "profiles-"
+_SUFFIX = ".json.gz"
+
+
+def _snapshot_files(directory: str) -> List[str]:
+    """Snapshot paths in ``directory``, newest first."""
+    if not os.path.isdir(directory):
+        return []
+    names = sorted(
+        (n for n in os.listdir(directory) if n.startswith(_PREFIX) and n.endswith(_SUFFIX)),
+        reverse=True
+    )
+    return [os.path.join(directory, n) for n in names]
+
+
+def snapshot_payload(cached: Dict[str, Optional[Dict[str, Any]]],
+                     stored: Callable[[], Iterable[Tuple[str, bytes]]]) -> Tuple[bytes, int]:
+    """
+    The JSON object of all records and their number. Stored records are copied in their
+    encoded form; ``cached`` entries replace them, and ``None`` drops them.
+    """
+    parts = [json_dumps(key) + b":" + json_dumps(value) for key, value in cached.items() if value is not None]
+    for key, raw in stored():
+        if key not in cached:
+            parts.append(json_dumps(key) + b":" + raw)
+    return b"{" + b",".join(parts) + b"}", len(parts)
+
+
+def write_snapshot(payload: bytes, count: int, directory: str, keep: int, schema_version: int = 0) -> str:
+    """
+    Writes ``payload`` as a gzip file holding a header line with its SHA-256 and the schema
+    version of the records, followed by the payload itself. The file only appears under its
+    final name once it is complete, and all but the newest ``keep`` snapshots are removed
+    afterwards.
+    """
+    os.makedirs(directory, exist_ok=True)
+    header = json.dumps({
+        "sha256": hashlib.sha256(payload).hexdigest(),
+        "count": count,
+        "schema_version": schema_version,
+        "created": datetime.now().isoformat(timespec="seconds")
+    }).encode('utf-8')
+
+    path = os.path.join(directory, f"{_PREFIX}{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}{_SUFFIX}")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as raw:
+        with gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6) as f:
+            f.write(header + b"\n" + payload)
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp_path, path)
+
+    for old in _snapshot_files(directory)[keep:]:
+        os.remove(old)
+    return path
+
+
+def read_snapshot(path: str) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+    """The header and the records of a snapshot."""
+    with gzip.open(path, 'rb') as f:
+        header, payload = f.read().split(b"\n", 1)
+    header = json.loads(header)
+    if hashlib.sha256(payload).hexdigest() != header["sha256"]:
+        raise ValueError(f"checksum mismatch in {path}")
+    return header, json_loads(payload)
+
+
+def restore_latest(directory: str) -> Optional[Tuple[Dict[str, Dict[str, Any]], int]]:
+    """
+    Returns the records of the newest snapshot that passes its checksum and their schema
+    version, or None. Snapshots older than the version field count as version 0.
+    """
+    for path in _snapshot_files(directory):
+        try:
+            header, records = read_snapshot(path)
+        except (OSError, EOFError, ValueError, KeyError) as e:
+            log.warning(f"skipping unreadable snapshot {path}: {e}")
+            continue
+        log.info(f"restored {len(records)} profiles from {path}")
+        return records, header.get("schema_version", 0)
+    return None
+
+
+def _build_and_write(cached, stored, schema_version: int) -> str:
+    payload, count = snapshot_payload(cached, stored)
+    return write_snapshot(payload, count, RES.SNAPSHOT_DIR, RES.SNAPSHOT_KEEP, schema_version)
+
+
+async def _take_snapshot(context: ContextTypes.DEFAULT_TYPE) -> None:
+    # only the shallow copies are taken on the loop, so the snapshot is point-in-time;
+    # encoding and assembling the payload happen in the worker thread
+    profile_manager = context.bot_data.get('profile_manager')
+    cached, stored = profile_manager.snapshot_source()
+    path = await asyncio.to_thread(_build_and_write, cached, stored, profile_manager.schema_version)
+    log.info(f"wrote snapshot {path}")
+
+
+def snapshot_job(app):
+    app.job_queue.run_repeating(
+        callback=_take_snapshot,
+        interval=RES.SNAPSHOT_INTERVAL_S,
+        first=RES.SNAPSHOT_INTERVAL_S,
+        name="profile_snapshot",
+    )
@@ -0,0 +1,502 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import aiofiles
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+from .utility import (
+    CODECS,
+    json_dumps,
+    json_loads,
+    json_read,
+    json_write
+)
+
+
+log = logging.getLogger(__name__)
+
+
+def _replay(data: Dict[str, Any], path: str, keep_deletions: bool = False) -> int:
+    """
+    Applies the records of one journal file on top of ``data``; returns how many were applied.
+    With ``keep_deletions`` a deleted record is set to None instead of removed.
+    """
+    if not os.path.exists(path):
+        return 0
+    applied = 0
+    with open(path, 'rb') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json_loads(line)
+            except json.JSONDecodeError:
+                # a crash mid-append leaves at most one torn record at the tail
+                log.warning(f"skipping torn journal record in {path}")
+                continue
+            if record.get("v") is None and not keep_deletions:
+                data.pop(record["k"], None)
+            else:
+                data[record["k"]] = record["v"]
+            applied += 1
+    return applied
+
+
+class ProfileStore:
+    """
+    Persistence backend of ``ProfileManager``.
+
+    Records are plain profile dicts keyed by the user id as a string; ``None`` deletes a record.
+    """
+
+    def keys(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def items(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        raise NotImplementedError
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        return dict(self.items())
+
+    def encoded_view(self) -> Callable[[], Iterable[Tuple[str, bytes]]]:
+        """
+        A view of every record as encoded JSON, cheap enough to take on the event loop.
+        Calling it does the reading, so it can run in a worker thread.
+        """
+        raise NotImplementedError
+
+    def recover(self, records: Dict[str, Dict[str, Any]]) -> None:
+        """Replaces unreadable or missing contents with ``records`` restored from elsewhere."""
+        raise NotImplementedError
+
+    async def put(self, key: str, value: Optional[Dict[str, Any]]) -> None:
+        await self.put_many({key: value})
+
+    async def put_many(self, records: Dict[str, Optional[Dict[str, Any]]]) -> None:
+        raise NotImplementedError
+
+    def write_many(self, records: Dict[str, Optional[Dict[str, Any]]]) -> None:
+        """Blocking ``put_many`` for maintenance work done before or outside the event loop."""
+        raise NotImplementedError
+
+    def get_meta(self, name: str, default: Any = None) -> Any:
+        raise NotImplementedError
+
+    def set_meta(self, name: str, value: Any) -> None:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+def _meta_path(path: str) -> str:
+    """Sidecar of a file store holding its metadata, e.g. ``database.meta.json``."""
+    return os.path.splitext(path)[0] + ".meta.json"
+
+
+def _encode(value: Dict[str, Any]) -> bytes:
+    # orjson hands back bytes with about 1 KB of spare capacity; records held in memory get an
+    # exact-size copy, or that slack would cost more than the record itself
+    return bytes(memoryview(json_dumps(value)))
+
+
+class _FileStore(ProfileStore):
+    """
+    Stores whose file format has to be read whole. Once read, every record is kept in
+    memory as its compact UTF-8 JSON encoding, a fraction of the size of the parsed dict.
+    """
+
+    _records: Optional[Dict[str, bytes]] = None
+    meta_path: str
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        raise NotImplementedError
+
+    def _read_records(self) -> Dict[str, bytes]:
+        return {key: _encode(value) for key, value in self._read().items()}
+
+    def meta(self) -> Dict[str, Any]:
+        return json_read(self.meta_path) if os.path.exists(self.meta_path) else {}
+
+    def get_meta(self, name: str, default: Any = None) -> Any:
+        return self.meta().get(name, default)
+
+    def set_meta(self, name: str, value: Any) -> None:
+        meta = self.meta()
+        meta[name] = value
+        tmp_path = self.meta_path + ".tmp"
+        json_write(tmp_path, meta)
+        os.replace(tmp_path, self.meta_path)
+
+    @property
+    def records(self) -> Dict[str, bytes]:
+        if self._records is None:
+            self._records = self._read_records()
+        return self._records
+
+    def keys(self) -> Iterable[str]:
+        return self.records.keys()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = self.records.get(key)
+        return json_loads(raw) if raw is not None else None
+
+    def items(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        # iterates a copy of the item list, so callers may await in between
+        for key, raw in list(self.records.items()):
+            yield key, json_loads(raw)
+
+    def encoded_view(self) -> Callable[[], Iterable[Tuple[str, bytes]]]:
+        # a shallow copy; the encoded records themselves are never modified
+        return dict(self.records).items
+
+    def _replace_file(self, path: str, records: Dict[str, Dict[str, Any]]) -> None:
+        if os.path.exists(path):
+            # keep the unreadable file around for inspection
+            os.replace(path, path + ".corrupt")
+        tmp_path = path + ".tmp"
+        json_write(tmp_path, records, indent=False)
+        os.replace(tmp_path, path)
+        self._records = None
+
+    def _apply(self, records: Dict[str, Optional[Dict[str, Any]]]) -> None:
+        for key, value in records.items():
+            if value is None:
+                self.records.pop(key, None)
+            else:
+                self.records[key] = _encode(value)
+
+    def _dump(self) -> bytes:
+        """The whole file, assembled from the already encoded records."""
+        body = b",\n".join(_encode(key) + b":" + raw for key, raw in self.records.items())
+        return b"{\n" + body + b"\n}"
+
+
+class JsonStore(_FileStore):
+    """The whole database as one JSON file, rewritten on every put."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.meta_path = _meta_path(path)
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        return json_read(self.path) if os.path.exists(self.path) else {}
+
+    def recover(self, records: Dict[str, Dict[str, Any]]) -> None:
+        self._replace_file(self.path, records)
+
+    async def put_many(self, records: Dict[str, Optional[Dict[str, Any]]]) -> None:
+        self._apply(records)
+        data = self._dump()
+        async with aiofiles.open(self.path, 'wb') as f:
+            await f.write(data)
+
+    def write_many(self, records: Dict[str, Optional[Dict[str, Any]]]) -> None:
+        self._apply(records)
+        with open(self.path, 'wb') as f:
+            f.write(self._dump())
+
+
+class JournalStore(_FileStore):
+    """
+    Snapshot file plus an append-only journal of per-user records.
+
+    Every save appends one compact line to the journal instead of rewriting the snapshot.
+    Once the journal grows past ``compact_threshold`` bytes it is rotated and folded into
+    a new snapshot in a worker thread.
+
+    With a ``binary_codec`` every new snapshot is mirrored in that codec as a map from user id
+    to the record's encoded JSON, the very form the records are kept in memory. Startup loads
+    the mirror without parsing any record, as long as the JSON snapshot is still the one it
+    was made from.
+    """
+
+    def __init__(self, snapshot_path: str, journal_path: str, compact_threshold: int = 1 << 20,
+                 binary_codec: Optional[str] = None):
+        self.snapshot_path = snapshot_path
+        self.binary = CODECS[binary_codec] if binary_codec else None
+        self.binary_path = None
+        if self.binary is not None:
+            self.binary_path = os.path.splitext(snapshot_path)[0] + self.binary.extension
+            # the mirror holds raw encoded records, which only a binary codec can write
+            assert self.binary_path != snapshot_path, f"{binary_codec!r} cannot mirror {snapshot_path}"
+        self.journal_path = journal_path
+        self.rotated_path = journal_path + ".1"
+        self.meta_path = _meta_path(snapshot_path)
+        self.compact_threshold = compact_threshold
+        self._lock = asyncio.Lock()
+        self._compaction: Optional[asyncio.Task] = None
+
+    def _snapshot_stamp(self) -> Dict[str, int]:
+        stat = os.stat(self.snapshot_path)
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def _write_binary(self, records: Dict[str, bytes]) -> None:
+        """Mirrors ``records``, the encoded current JSON snapshot, tagged with the size and mtime of that file."""
+        if self.binary is None:
+            return
+        header = json_dumps({"codec": self.binary.name, **self._snapshot_stamp()})
+        payload = self.binary.dumps(records)
+        tmp_path = self.binary_path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(header + b"\n" + payload)
+        os.replace(tmp_path, self.binary_path)
+
+    def _read_binary(self) -> Optional[Dict[str, bytes]]:
+        if self.binary is None or not os.path.exists(self.binary_path) or not os.path.exists(self.snapshot_path):
+            return None
+        try:
+            with open(self.binary_path, 'rb') as f:
+                header = json_loads(f.readline())
+                if header != {"codec": self.binary.name, **self._snapshot_stamp()}:
+                    # the JSON snapshot was rewritten by something else, e.g. data/edit_data.py
+                    return None
+                return self.binary.loads(f.read())
+        except Exception as e:
+            log.warning(f"ignoring unreadable binary snapshot {self.binary_path}: {e}")
+            return None
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        data = json_read(self.snapshot_path) if os.path.exists(self.snapshot_path) else {}
+        # a rotated journal means the last compaction did not finish; it is older than the live one
+        for path in (self.rotated_path, self.journal_path):
+            _replay(data, path)
+        return data
+
+    def _read_records(self) -> Dict[str, bytes]:
+        records = self._read_binary()
+        if records is None:
+            return super()._read_records()
+        changes: Dict[str, Optional[Dict[str, Any]]] = {}
+        for path in (self.rotated_path, self.journal_path):
+            _replay(changes, path, keep_deletions=True)
+        for key, value in changes.items():
+            if value is None:
+                records.pop(key, None)
+            else:
+                records[key] = _encode(value)
+        return records
+
+    def recover(self, records: Dict[str, Dict[str, Any]]) -> None:
+        # the journal stays; its records are newer than any restored copy and replay on top
+        self._replace_file(self.snapshot_path, records)
+        self._write_binary({key: _encode(value) for key, value in records.items()})
+
+    @staticmethod
+    def _lines(records: Dict[str, Optional[Dict[str, Any]]]) -> bytes:
+        return b"".join(json_dumps({"k": key, "v": value}) + b"\n" for key, value in records.items())
+
+    async def put_many(self, records: Dict[str, Optional[Dict[str, Any]]]) -> None:
+        self._apply(records)
+        lines = self._lines(records)
+        async with self._lock:
+            async with aiofiles.open(self.journal_path, 'ab') as f:
+                await f.write(lines)
+                await f.flush()
+            size = os.path.getsize(self.journal_path)
+        if size >= self.compact_threshold and not self.compacting:
+            self._compaction = asyncio.create_task(self.compact())
+            self._compaction.add_done_callback(self._compaction_done)
+
+    def _compaction_done(self, task: asyncio.Task) -> None:
+        self._compaction = None
+        if not task.cancelled() and task.exception() is not None:
+            # the journal keeps every record, so nothing is lost; the next save past the
+            # threshold tries again
+            log.error(f"journal compaction failed: {task.exception()!r}")
+
+    def write_many(self, records: Dict[str, Optional[Dict[str, Any]]]) -> None:
+        self._apply(records)
+        with open(self.journal_path, 'ab') as f:
+            f.write(self._lines(records))
+        # waiting for the journal to outgrow the snapshot as well keeps a long run of batches
+        # from rewriting the whole snapshot after every one of them
+        snapshot_size = os.path.getsize(self.snapshot_path) if os.path.exists(self.snapshot_path) else 0
+        limit = max(self.compact_threshold, snapshot_size)
+        if os.path.getsize(self.journal_path) >= limit and not self.compacting:
+            self._compact_in_place()
+
+    def _compact_in_place(self) -> None:
+        """Blocking compaction that writes the snapshot from memory, which already holds every journaled record."""
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(self._dump())
+        os.replace(tmp_path, self.snapshot_path)
+        self._write_binary(dict(self.records))
+        for path in (self.rotated_path, self.journal_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    @property
+    def compacting(self) -> bool:
+        return self._compaction is not None and not self._compaction.done()
+
+    async def close(self) -> None:
+        if self._compaction is not None:
+            # a failure is logged by _compaction_done
+            await asyncio.wait([self._compaction])
+
+    async def compact(self) -> None:
+        async with self._lock:
+            if os.path.exists(self.rotated_path):
+                # leftover from an interrupted compaction; fold it before rotating again
+                await asyncio.to_thread(self._fold)
+            if not os.path.exists(self.journal_path):
+                return
+            os.replace(self.journal_path, self.rotated_path)
+        # new appends go to a fresh journal while the rotated one is folded off the loop
+        await asyncio.to_thread(self._fold)
+
+    def _fold(self) -> None:
+        data = json_read(self.snapshot_path) if os.path.exists(self.snapshot_path) else {}
+        applied = _replay(data, self.rotated_path)
+        tmp_path = self.snapshot_path + ".tmp"
+        json_write(tmp_path, data, indent=False)
+        os.replace(tmp_path, self.snapshot_path)
+        self._write_binary({key: _encode(value) for key, value in data.items()})
+        os.remove(self.rotated_path)
+        log.info(f"compacted {applied} journal records into {self.snapshot_path}")
+
+
+class SqliteStore(ProfileStore):
+    """
+    One row per user in an SQLite database running in WAL mode.
+
+    The fields used for lookups and audiences are stored as indexed columns next to the
+    JSON encoded record, so single-user reads and writes never touch the other rows.
+    """
+
+    INDEXED = ("student_id", "email", "phone_number", "is_verified", "self_reserve")
+
+    PAGE_SIZE = 500
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = asyncio.Lock()
+        # writes run in worker threads and reads on the loop or in export threads; each
+        # connection is only ever used by one thread at a time, and WAL lets them overlap
+        self._writer = sqlite3.connect(path, check_same_thread=False)
+        self._writer_lock = threading.Lock()
+        self._writer.execute("PRAGMA journal_mode=WAL")
+        self._writer.execute("PRAGMA synchronous=NORMAL")
+        columns = ", ".join(self.INDEXED)
+        self._writer.execute(
+            f"CREATE TABLE IF NOT EXISTS profiles (user_id TEXT PRIMARY KEY, {columns}, data TEXT NOT NULL)"
+        )
+        for name in self.INDEXED:
+            self._writer.execute(f"CREATE INDEX IF NOT EXISTS idx_profiles_{name} ON profiles ({name})")
+        self._writer.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._writer.commit()
+        self._reader = sqlite3.connect(path, check_same_thread=False)
+        self._reader_lock = threading.Lock()
+
+    def _fetch(self, sql: str, params: tuple = ()) -> list:
+        with self._reader_lock:
+            return self._reader.execute(sql, params).fetchall()
+
+    def is_empty(self) -> bool:
+        return not self._fetch("SELECT 1 FROM profiles LIMIT 1")
+
+    def keys(self) -> Iterable[str]:
+        return [user_id for user_id, in self._fetch("SELECT user_id FROM profiles")]
+
+    def items(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        # page by key, so no cursor stays open while the caller works or awaits between rows
+        last = ""
+        while rows := self._fetch("SELECT user_id, data FROM profiles WHERE user_id > ? ORDER BY user_id LIMIT ?",
+                                  (last, self.PAGE_SIZE)):
+            for user_id, data in rows:
+                yield user_id, json_loads(data)
+            last = rows[-1][0]
+
+    def encoded_view(self) -> Callable[[], Iterable[Tuple[str, bytes]]]:
+        def rows() -> Iterator[Tuple[str, bytes]]:
+            # a connection of its own reads a consistent WAL snapshot while writes go on
+            conn = sqlite3.connect(self.path)
+            try:
+                for user_id, data in conn.execute("SELECT user_id, data FROM profiles"):
+                    yield user_id, data.encode('utf-8')
+            finally:
+                conn.close()
+        return rows
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        rows = self._fetch("SELECT data FROM profiles WHERE user_id = ?", (key,))
+        return json_loads(rows[0][0]) if rows else None
+
+    def _row(self, key: str, value: Dict[str, Any]) -> tuple:
+        return (key, *(value.get(name) for name in self.INDEXED), _encode(value).decode('utf-8'))
+
+    def _write(self, records: Dict[str, Optional[Dict[str, Any]]]) -> None:
+        placeholders = ", ".join("?" * (len(self.INDEXED) + 2))
+        with self._writer_lock, self._writer:
+            for key, value in records.items():
+                if value is None:
+                    self._writer.execute("DELETE FROM profiles WHERE user_id = ?", (key,))
+                else:
+                    self._writer.execute(f"INSERT OR REPLACE INTO profiles VALUES ({placeholders})",
+                                         self._row(key, value))
+
+    def write_many(self, records: Dict[str, Optional[Dict[str, Any]]]) -> None:
+        self._write(records)
+
+    def get_meta(self, name: str, default: Any = None) -> Any:
+        rows = self._fetch("SELECT value FROM meta WHERE name = ?", (name,))
+        return json.loads(rows[0][0]) if rows else default
+
+    def set_meta(self, name: str, value: Any) -> None:
+        with self._writer_lock, self._writer:
+            self._writer.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (name, json.dumps(value)))
+
+    def recover(self, records: Dict[str, Dict[str, Any]]) -> None:
+        self.import_records(records)
+
+    def import_records(self, records: Dict[str, Dict[str, Any]]) -> None:
+        placeholders = ", ".join("?" * (len(self.INDEXED) + 2))
+        with self._writer_lock, self._writer:
+            self._writer.executemany(
+                f"INSERT OR REPLACE INTO profiles VALUES ({placeholders})",
+                (self._row(key, value) for key, value in records.items())
+            )
+
+    async def put_many(self, records: Dict[str, Optional[Dict[str, Any]]]) -> None:
+        async with self._lock:
+            await asyncio.to_thread(self._write, records)
+
+    async def close(self) -> None:
+        async with self._lock:
+            with self._writer_lock:
+                self._writer.close()
+            with self._reader_lock:
+                self._reader.close()
+
+
+def open_store(kind: str, database_path: str, journal_path: str, sqlite_path: str,
+               compact_threshold: int = 1 << 20, binary_codec: Optional[str] = None) -> ProfileStore:
+    if kind == "json":
+        return JsonStore(database_path)
+    if kind == "journal":
+        if binary_codec and (binary_codec not in CODECS or binary_codec == "json"):
+            log.warning(f"snapshot codec {binary_codec!r} is not an available binary codec; "
+                        f"keeping JSON snapshots only")
+            binary_codec = None
+        return JournalStore(database_path, journal_path, compact_threshold, binary_codec)
+    if kind == "sqlite":
+        store = SqliteStore(sqlite_path)
+        if store.is_empty():
+            # first start on SQLite: carry over whatever the JSON snapshot and journal hold
+            source = JournalStore(database_path, journal_path)
+            records = source.load()
+            if records:
+                store.import_records(records)
+                for name, value in source.meta().items():
+                    store.set_meta(name, value)
+                log.info(f"migrated {len(records)} profiles from {database_path} to {sqlite_path}")
+        return store
+    raise ValueError(f"Unknown storage backend: {kind}")
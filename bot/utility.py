@@ -4,9 +4,20 @@ import os
 import csv
 import re
 from functools import wraps
+from typing import Any, Callable, NamedTuple
 import aiofiles
 import asyncio
 
+try:
+    import orjson
+except ImportError:  # the standard library json is used instead
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # binary snapshots are then unavailable
+    msgpack = None
+
 
 def log_calls(fn):
     @wraps(fn)
@@ -36,14 +47,45 @@ def _convert_value(val):
     return val
 
 
+def json_dumps(data, indent: bool = False) -> bytes:
+    """UTF-8 JSON, compact unless ``indent``; encoded by orjson when it is installed."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(data, option=option)
+    if indent:
+        return json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def json_loads(raw):
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+
+class Codec(NamedTuple):
+    name: str
+    extension: str
+    dumps: Callable[[Any], bytes]
+    loads: Callable[[bytes], Any]
+
+
+CODECS = {"json": Codec("json", ".json", json_dumps, json_loads)}
+if msgpack is not None:
+    CODECS["msgpack"] = Codec(
+        "msgpack",
+        ".msgpack",
+        lambda data: msgpack.packb(data, use_bin_type=True),
+        lambda raw: msgpack.unpackb(raw, raw=False, strict_map_key=False)
+    )
+
+
 def json_read(path):
-    with open(path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    with open(path, 'rb') as f:
+        return json_loads(f.read())
 
 
-def json_write(path, data):
-    with open(path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+def json_write(path, data, indent: bool = True):
+    with open(path, 'wb') as f:
+        f.write(json_dumps(data, indent))
 
 
 def json_key_update(path, key, value=None):
@@ -59,14 +101,14 @@ def json_key_update(path, key, value=None):
 
 
 async def async_json_read(path):
-    async with aiofiles.open(path, 'r', encoding='utf-8') as f:
+    async with aiofiles.open(path, 'rb') as f:
         content = await f.read()
-    return json.loads(content)
+    return json_loads(content)
 
 
-async def async_json_write(path, data):
-    json_data = json.dumps(data, ensure_ascii=False, indent=2)
-    async with aiofiles.open(path, 'w', encoding='utf-8') as f:
+async def async_json_write(path, data, indent: bool = True):
+    json_data = json_dumps(data, indent)
+    async with aiofiles.open(path, 'wb') as f:
         await f.write(json_data)
 
 
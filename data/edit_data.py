@@ -1,16 +1,16 @@
 import argparse
 import os
+import sys
 import json
+from dataclasses import fields
 
-EDIT_DATA_PATH = os.path.join("data", "database.json")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-def json_read(path):
-    with open(path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+from bot.construct import Config, RES
+from bot.migrations import apply_operations, migrate, SCHEMA_VERSION
+from bot.profiles import Profile
+from bot.storage import open_store
 
-def json_write(path, data):
-    with open(path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
 
 def smart_parse(value):
     try:
@@ -18,50 +18,50 @@ def smart_parse(value):
     except json.JSONDecodeError:
         return value
 
-def add_key_to_all_profiles(key: str, value):
-    data = json_read(EDIT_DATA_PATH)
-    for profile in data.values():
-        profile[key] = value
-    json_write(EDIT_DATA_PATH, data)
+def open_profiles(kind):
+    return open_store(kind, RES.DATABASE_PATH, RES.JOURNAL_PATH, RES.SQLITE_PATH, RES.JOURNAL_COMPACT_BYTES,
+                      Config.SNAPSHOT_CODEC)
+
+def run_operation(store, **operation):
+    return apply_operations(store, [operation])[0]
+
+def add_key_to_all_profiles(store, key: str, value):
+    run_operation(store, op="add-key", key=key, value=value)
     print(f"✅ Key '{key}' with value '{value}' added to all profiles.")
 
-def edit_existing_key(key: str, value):
-    data = json_read(EDIT_DATA_PATH)
-    updated = 0
-    for profile in data.values():
-        if key in profile:
-            profile[key] = value
-            updated += 1
-    json_write(EDIT_DATA_PATH, data)
+def edit_existing_key(store, key: str, value):
+    updated = run_operation(store, op="edit-key", key=key, value=value)
     print(f"✅ Updated '{key}' in {updated} profiles with value '{value}'.")
 
-def rename_key_in_all_profiles(old_key: str, new_key: str):
-    data = json_read(EDIT_DATA_PATH)
-    renamed = 0
-    for profile in data.values():
-        if old_key in profile:
-            profile[new_key] = profile.pop(old_key)
-            renamed += 1
-    json_write(EDIT_DATA_PATH, data)
+def rename_key_in_all_profiles(store, old_key: str, new_key: str):
+    renamed = run_operation(store, op="rename-key", old_key=old_key, new_key=new_key)
     print(f"🔁 Renamed '{old_key}' to '{new_key}' in {renamed} profiles.")
 
-def delete_key_in_all_profiles(key: str):
-    data = json_read(EDIT_DATA_PATH)
-    deleted = 0
-    for profile in data.values():
-        if key in profile:
-            profile.pop(key)
-            deleted += 1
-    json_write(EDIT_DATA_PATH, data)
+def delete_key_in_all_profiles(store, key: str):
+    deleted = run_operation(store, op="delete-key", key=key)
     print(f"🗑️ Deleted key '{key}' from {deleted} profiles.")
 
-def show_profiles():
-    data = json_read(EDIT_DATA_PATH)
+def apply_file(store, path: str):
+    with open(path, 'r', encoding='utf-8') as f:
+        operations = json.load(f)
+    counts = apply_operations(store, operations)
+    for operation, count in zip(operations, counts):
+        print(f"✅ {operation['op']} {operation}: {count} profiles.")
+
+def run_migrations(store):
+    before = store.get_meta(SCHEMA_VERSION, 0)
+    after = migrate(store, RES.MIGRATIONS_DIR, {f.name for f in fields(Profile)})
+    print(f"✅ Schema version {before} -> {after}.")
+
+def show_profiles(store):
     from pprint import pprint
-    pprint(data)
+    pprint(dict(store.items()))
+    print(f"schema version: {store.get_meta(SCHEMA_VERSION, 0)}")
 
 def parse_args():
-    parser = argparse.ArgumentParser(description="Manage profile data in database.json")
+    parser = argparse.ArgumentParser(description="Manage profile data in the profile store")
+    parser.add_argument("--storage", default=Config.STORAGE, choices=["json", "journal", "sqlite"],
+                        help="Store to edit (defaults to the bot's STORAGE setting)")
     subparsers = parser.add_subparsers(dest="command")
 
     add_parser = subparsers.add_parser("add-key", help="Add a key:value pair to all profiles")
@@ -79,22 +79,32 @@ def parse_args():
     delete_parser = subparsers.add_parser("delete-key", help="Delete a key from all profiles")
     delete_parser.add_argument("key", help="Key to delete")
 
+    apply_parser = subparsers.add_parser("apply", help="Apply a JSON list of operations in one pass")
+    apply_parser.add_argument("file", help="Operations file, e.g. [{\"op\": \"delete-key\", \"key\": \"scale\"}]")
+
+    subparsers.add_parser("migrate", help=f"Run the pending migrations in {RES.MIGRATIONS_DIR}")
+
     subparsers.add_parser("show", help="Display all profile data")
 
     return parser.parse_args()
 
 def main():
     args = parse_args()
+    store = open_profiles(args.storage)
     if args.command == "add-key":
-        add_key_to_all_profiles(args.key, args.value)
+        add_key_to_all_profiles(store, args.key, args.value)
     elif args.command == "edit-key":
-        edit_existing_key(args.key, args.value)
+        edit_existing_key(store, args.key, args.value)
     elif args.command == "rename-key":
-        rename_key_in_all_profiles(args.old_key, args.new_key)
+        rename_key_in_all_profiles(store, args.old_key, args.new_key)
     elif args.command == "delete-key":
-        delete_key_in_all_profiles(args.key)
+        delete_key_in_all_profiles(store, args.key)
+    elif args.command == "apply":
+        apply_file(store, args.file)
+    elif args.command == "migrate":
+        run_migrations(store)
     elif args.command == "show":
-        show_profiles()
+        show_profiles(store)
     else:
         print("❌ Invalid command. Use --help for more information.")
 
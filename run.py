@@ -1,5 +1,6 @@
 import argparse
 import logging
+from bot.construct import Config
 from bot.core import TelegramBot
 
 
@@ -11,11 +12,19 @@ def main():
         help="If set, notify all users about the update"
     )
 
+    parser.add_argument(
+        "--webhook",
+        action="store_true",
+        help="Receive updates on a local HTTP endpoint (WEBHOOK_* settings) instead of polling"
+    )
+
     args = parser.parse_args()
+    if args.webhook and not Config.WEBHOOK_SECRET:
+        parser.error("--webhook needs WEBHOOK_SECRET, the token Telegram sends with every update")
     bot = TelegramBot(updated=args.updated)
     bot.load_profiles()
     bot.register_handlers()
-    bot.run()
+    bot.run(webhook=args.webhook)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,78 @@
+import asyncio
+import os
+
+# bot.construct reads these at import time
+os.environ.setdefault("ADMIN_ID", "0")
+os.environ.setdefault("GROUP_ID", "0")
+
+import pytest  # noqa: E402
+
+from bot.construct import RES  # noqa: E402
+from bot.indexes import StatsIndex  # noqa: E402
+from bot.profiles import ProfileManager  # noqa: E402
+from bot.storage import JournalStore  # noqa: E402
+
+
+def member(n, **fields):
+    record = dict(
+        first_name=f"first{n}",
+        last_name=f"last{n}",
+        study_field="CS",
+        student_id=1000 + n,
+        email=f"member{n}@example.com",
+        phone_number=9120000000 + n,
+        degree="BSc",
+        university="UT",
+        skills=["Python"],
+        interests=["AI"],
+    )
+    record.update(fields)
+    return record
+
+
+def full_scan(profile_manager):
+    index = StatsIndex()
+    for user_id, record in profile_manager.iter_records():
+        index.update(user_id, record)
+    return index.counts
+
+
+@pytest.fixture
+def profile_manager(tmp_path, monkeypatch):
+    # an empty store would otherwise be restored from the bot's own snapshots
+    monkeypatch.setattr(RES, "SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+    store = JournalStore(str(tmp_path / "database.json"), str(tmp_path / "database.journal"))
+    return ProfileManager(store)
+
+
+def test_counts_follow_add_edit_delete(profile_manager):
+    pm = profile_manager
+    pm.add_profile(1, member(1))
+    pm.add_profile(2, member(2, university="SUT", degree="MSc", skills=["Python", "Go"]))
+    pm.add_profile(3, member(3, study_field="EE", interests=[]))
+    assert pm.stats.counts == full_scan(pm)
+
+    profile = pm.get(2)
+    profile.university = "UT"
+    profile.skills = ["Go"]
+    profile.is_signed_up = True
+    profile.is_verified = True
+    asyncio.run(pm.save(2))
+    assert pm.stats.counts == full_scan(pm)
+
+    pm.delete_profile(1)
+    assert pm.stats.counts == full_scan(pm)
+    assert pm.stats.counts["university"] == {"UT": 2}
+    assert pm.stats.counts["status"] == {"verified": 1, "incomplete": 1}
+
+
+def test_counts_after_restart_match_full_scan(profile_manager, tmp_path):
+    pm = profile_manager
+    for n in range(20):
+        pm.add_profile(n, member(n, university=f"uni{n % 3}", skills=["Python"] if n % 2 else []))
+    pm.delete_profile(4)
+    asyncio.run(pm.close())
+
+    reloaded = ProfileManager(JournalStore(str(tmp_path / "database.json"), str(tmp_path / "database.journal")))
+    assert reloaded.stats.counts == full_scan(reloaded)
+    assert reloaded.stats.counts == pm.stats.counts